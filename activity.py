@@ -0,0 +1,69 @@
+from array import array
+
+# --- Monitored-channel activity index ---
+# A fixed-size ring of (epoch timestamp, channel id) per user. Timestamps are
+# appended in order, so "messages since X" is a binary search over the ring
+# instead of parsing every stored timestamp. Message content is never kept.
+
+class ActivityRing:
+    __slots__ = ('timestamps', 'channels', 'start', 'size')
+
+    def __init__(self, capacity):
+        self.timestamps = array('d', [0.0]) * capacity
+        self.channels = array('q', [0]) * capacity
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _slot(self, i):
+        """Physical slot of the i-th oldest entry"""
+        return (self.start + i) % len(self.timestamps)
+
+    def append(self, ts, channel_id):
+        capacity = len(self.timestamps)
+        if self.size:
+            # Keep the ring sorted even if the clock steps backwards
+            ts = max(ts, self.timestamps[self._slot(self.size - 1)])
+        if self.size < capacity:
+            slot = self._slot(self.size)
+            self.size += 1
+        else:
+            slot = self.start
+            self.start = (self.start + 1) % capacity
+        self.timestamps[slot] = ts
+        self.channels[slot] = channel_id
+
+    def _first_at_or_after(self, since):
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamps[self._slot(mid)] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def count_since(self, since):
+        return self.size - self._first_at_or_after(since)
+
+class ActivityIndex:
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.rings = {}
+
+    def record(self, user_id, channel_id, ts):
+        ring = self.rings.get(user_id)
+        if ring is None:
+            ring = self.rings[user_id] = ActivityRing(self.capacity)
+        ring.append(ts, channel_id)
+
+    def load(self, records):
+        """Fill the index from (user_id, channel_id, ts) records sorted by ts"""
+        for user_id, channel_id, ts in records:
+            self.record(int(user_id), channel_id, ts)
+
+    def count_since(self, user_id, since):
+        ring = self.rings.get(user_id)
+        return ring.count_since(since) if ring else 0
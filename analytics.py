@@ -0,0 +1,150 @@
+import math
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # Optional, the pure Python path gives the same numbers
+    np = None
+
+# --- Coverage analytics ---
+# Per-hour, per-weekday heatmaps of check-ins, misses and monitored-channel
+# activity, plus how many mods are on shift in each hour of the week, over a
+# long range for every mod at once. Timestamps come in as flat epoch lists
+# and are binned into the 168 (weekday, hour) slots of a local week with
+# numpy when it is installed. Everything here is CPU work meant for a worker
+# thread.
+#
+# Coverage is exact to the second: hour h of the range gets the summed
+# overlap of every shift with it, from prefix sums over sorted shift starts
+# and ends, so it costs O((shifts + hours) log shifts).
+
+HEATMAP_KINDS = ('checkins', 'missed', 'activity')
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+SLOTS = 7 * 24
+# 1970-01-01, day 0 of the epoch, was a Thursday
+EPOCH_WEEKDAY = 3
+
+def _utc_offset(hour, tz):
+    """UTC offset in seconds during the UTC hour `hour` (hours since the epoch)"""
+    return int(datetime.fromtimestamp(hour * 3600, tz).utcoffset().total_seconds())
+
+def _slot(local):
+    days, seconds = divmod(int(local), 86400)
+    return (days + EPOCH_WEEKDAY) % 7 * 24 + seconds // 3600
+
+def weekly_histogram(times, tz, weights=None):
+    """Count (or sum weights of) timestamps per local (weekday, hour), as 7 rows of 24"""
+    if np is not None:
+        ts = np.floor(np.asarray(times, dtype=np.float64)).astype(np.int64)
+        # Look the offset up once per distinct UTC hour, not once per timestamp
+        hours, inverse = np.unique(ts // 3600, return_inverse=True)
+        offsets = np.array([_utc_offset(hour, tz) for hour in hours.tolist()], dtype=np.int64)
+        local = ts + offsets[inverse.reshape(-1)]
+        slots = (local // 86400 + EPOCH_WEEKDAY) % 7 * 24 + local % 86400 // 3600
+        counts = np.bincount(slots, weights=weights, minlength=SLOTS)
+        return counts.reshape(7, 24).tolist()
+    counts = [0] * SLOTS
+    offsets = {}
+    for i, ts in enumerate(times):
+        hour = int(ts // 3600)
+        if hour not in offsets:
+            offsets[hour] = _utc_offset(hour, tz)
+        counts[_slot(ts + offsets[hour])] += 1 if weights is None else weights[i]
+    return [counts[day * 24:(day + 1) * 24] for day in range(7)]
+
+def coverage_hours(shifts, start, hours, now):
+    """Mods on shift, averaged over each hour of the range beginning at `start`.
+
+    ``shifts`` are (start, end) pairs; open shifts (end None) count until now.
+    """
+    end = start + hours * 3600
+    if np is not None:
+        if not shifts:
+            return np.zeros(hours).tolist()
+        pairs = np.array([(s, now if e is None else e) for s, e in shifts], dtype=np.float64)
+        # Seconds into the range, which keeps the prefix sums small enough to stay exact
+        pairs = np.clip(pairs, start, end) - start
+        starts, ends = np.sort(pairs[:, 0]), np.sort(pairs[:, 1])
+        edges = 3600.0 * np.arange(hours + 1)
+
+        def on_shift_before(t, points):
+            # sum of (t - p) over the points p before t
+            n = np.searchsorted(points, t)
+            prefix = np.concatenate(([0.0], np.cumsum(points)))
+            return t * n - prefix[n]
+
+        # Seconds on shift before each edge, summed over every shift
+        total = on_shift_before(edges, starts) - on_shift_before(edges, ends)
+        return (np.diff(total) / 3600).tolist()
+    covered = [0.0] * hours
+    for shift_start, shift_end in shifts:
+        shift_start = max(shift_start, start)
+        shift_end = min(now if shift_end is None else shift_end, end)
+        hour = int((shift_start - start) // 3600)
+        while shift_start < shift_end:
+            hour_end = start + (hour + 1) * 3600
+            covered[hour] += (min(shift_end, hour_end) - shift_start) / 3600
+            shift_start = hour_end
+            hour += 1
+    return covered
+
+def coverage_gaps(coverage, min_mods=1.0, limit=5):
+    """Longest runs of consecutive hours of the week (wrapping Sunday to Monday) averaging under min_mods.
+
+    Returns (weekday, hour, length, mean mods on shift) with the longest runs first.
+    """
+    flat = [value for row in coverage for value in row]
+    if all(value < min_mods for value in flat):
+        return [(0, 0, SLOTS, sum(flat) / SLOTS)]
+    # Start scanning right after a covered hour so no run is split by the wrap
+    first = next(i for i, value in enumerate(flat) if value >= min_mods)
+    runs, run = [], []
+    for offset in range(1, SLOTS + 1):
+        slot = (first + offset) % SLOTS
+        if flat[slot] < min_mods:
+            run.append(slot)
+        elif run:
+            runs.append(run)
+            run = []
+    runs.sort(key=len, reverse=True)
+    return [(run[0] // 24, run[0] % 24, len(run), sum(flat[slot] for slot in run) / len(run))
+            for run in runs[:limit]]
+
+def build_report(events, shifts, tz, start, days, now, min_mods=1.0):
+    """Heatmaps and coverage for `days` days from start.
+
+    ``events`` are (user_id, kind, ts) and ``shifts`` (user_id, start, end),
+    as returned by Store.events_between() and Store.shift_intervals().
+    """
+    times = {kind: [] for kind in HEATMAP_KINDS}
+    for _, kind, ts in events:
+        times[kind].append(ts)
+    report = {kind: weekly_histogram(kind_times, tz) for kind, kind_times in times.items()}
+    report['totals'] = {kind: len(kind_times) for kind, kind_times in times.items()}
+
+    hours = days * 24
+    covered = coverage_hours([(s, e) for _, s, e in shifts], start, hours, now)
+    hour_starts = [start + 3600 * hour for hour in range(hours)]
+    # Sum of mods on shift per slot over how many times the slot occurs in the range
+    summed = weekly_histogram(hour_starts, tz, weights=covered)
+    occurrences = weekly_histogram(hour_starts, tz)
+    report['coverage'] = [[total / count if count else 0.0 for total, count in zip(total_row, count_row)]
+                          for total_row, count_row in zip(summed, occurrences)]
+    report['gaps'] = coverage_gaps(report['coverage'], min_mods)
+    report['mods'] = len({user_id for user_id, _, _ in shifts})
+    report['backend'] = 'numpy' if np is not None else 'python'
+    return report
+
+# --- Text rendering ---
+SHADES = ' ░▒▓█'
+
+def render_heatmap(grid):
+    """A 7x24 grid as shaded text, one row per weekday, scaled to the grid's maximum"""
+    peak = max(max(row) for row in grid)
+    header = '    ' + ''.join(f'{hour:<6}' for hour in range(0, 24, 6))
+    lines = [header.rstrip()]
+    for day, row in zip(WEEKDAYS, grid):
+        cells = ''.join(SHADES[math.ceil(value / peak * (len(SHADES) - 1))] if peak else ' '
+                        for value in row)
+        lines.append(f'{day} {cells}')
+    return '\n'.join(lines)
@@ -0,0 +1,239 @@
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+# --- Archive segments ---
+# Shifts, check-ins and misses older than the retention window are moved out
+# of mod_data.json into one gzip-compressed JSON segment per calendar month
+# under mod_data.archive/. A segment is only read when a query's range
+# reaches back into its month. index.json is the commit point: it names the
+# current file of every month, the cutoff below which records live in the
+# archive and per-user counts per month, so all-time stats never open a
+# segment.
+
+ARCHIVED_KINDS = ('shifts', 'checkins', 'missed')
+
+def item_ts(kind, item):
+    """Epoch timestamp of a stored record; shifts are dated by their start"""
+    return datetime.fromisoformat(item['start'] if kind == 'shifts' else item).timestamp()
+
+def is_archivable(kind, item, cutoff):
+    """Whether a record belongs in the archive for a given cutoff.
+
+    Shifts are judged by their end so that an open shift, or one that ends
+    after the cutoff, stays hot. New records are always newer than any past
+    cutoff, so the answer for a given cutoff never changes.
+    """
+    if kind == 'shifts':
+        return item['end'] is not None and datetime.fromisoformat(item['end']).timestamp() < cutoff
+    return item_ts(kind, item) < cutoff
+
+def prune_archived(data, cutoff):
+    """Drop every archivable record from a data dict, returns how many were removed"""
+    removed = 0
+    for user_id in list(data):
+        user_data = data[user_id]
+        for kind in ARCHIVED_KINDS:
+            items = user_data.get(kind, [])
+            kept = [item for item in items if not is_archivable(kind, item, cutoff)]
+            removed += len(items) - len(kept)
+            user_data[kind] = kept
+        if not any(user_data.values()):
+            del data[user_id]
+    return removed
+
+def month_of(ts, tz):
+    return datetime.fromtimestamp(ts, tz).strftime('%Y-%m')
+
+def retention_cutoff(now, months):
+    """Start of the oldest month kept hot when keeping `months` months, the current one included"""
+    index = now.year * 12 + now.month - 1 - (months - 1)
+    return now.replace(year=index // 12, month=index % 12 + 1, day=1,
+                       hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+class ArchiveSegments:
+    """Month-partitioned, compressed history behind a small LRU of decoded segments"""
+
+    def __init__(self, directory, tz, cache_size=4):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self.tz = tz
+        self.cache_size = cache_size
+        self.index = {'cutoff': None, 'retention_months': None, 'segments': {}}
+        self.loads = 0
+        self._cache = OrderedDict()
+        # Segments are read and written on worker threads
+        self._lock = threading.Lock()
+
+    @property
+    def cutoff(self):
+        return self.index['cutoff']
+
+    @property
+    def months(self):
+        return sorted(self.index['segments'])
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                self.index = json.load(f)
+        except FileNotFoundError:
+            pass
+        return self.index
+
+    def _save_index(self, index):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    def set_retention(self, months):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            index = dict(self.index, retention_months=months)
+            self._save_index(index)
+            self.index = index
+
+    # --- Reading ---
+    def segment(self, month):
+        """Decoded segment for a month, {user_id: {kind: [records]}}"""
+        with self._lock:
+            entry = self.index['segments'].get(month)
+            if entry is None:
+                return {}
+            cached = self._cache.get(entry['file'])
+            if cached is not None:
+                self._cache.move_to_end(entry['file'])
+                return cached
+            with gzip.open(os.path.join(self.directory, entry['file']), 'rt') as f:
+                records = json.load(f)
+            self.loads += 1
+            self._cache[entry['file']] = records
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return records
+
+    def _months_between(self, start, end):
+        first = month_of(start, self.tz) if start is not None else None
+        last = month_of(end, self.tz) if end is not None else None
+        return [month for month in self.months
+                if (first is None or month >= first) and (last is None or month <= last)]
+
+    def total(self, user_id, kind):
+        """All-time archived count, answered from the index alone"""
+        user_id = str(user_id)
+        return sum(entry['counts'].get(user_id, {}).get(kind, 0)
+                   for entry in self.index['segments'].values())
+
+    def counts(self, user_ids, kinds, start=None, end=None):
+        """{user_id: {kind: count}} of archived records in [start, end); user_ids=None for everyone"""
+        if start is None and end is None:
+            counts = {}
+            for entry in self.index['segments'].values():
+                for user_id, user_counts in entry['counts'].items():
+                    if user_ids is None or user_id in user_ids:
+                        row = counts.setdefault(user_id, dict.fromkeys(kinds, 0))
+                        for kind in kinds:
+                            row[kind] += user_counts.get(kind, 0)
+            return counts
+        counts = {}
+        for month in self._months_between(start, end):
+            for user_id, user_data in self.segment(month).items():
+                if user_ids is not None and user_id not in user_ids:
+                    continue
+                row = counts.setdefault(user_id, dict.fromkeys(kinds, 0))
+                for kind in kinds:
+                    row[kind] += sum(1 for item in user_data.get(kind, [])
+                                     if (start is None or item_ts(kind, item) >= start)
+                                     and (end is None or item_ts(kind, item) < end))
+        return counts
+
+    def times(self, user_id, kind, start=None, end=None):
+        """Archived timestamps of a user's events in [start, end)"""
+        times = []
+        for month in self._months_between(start, end):
+            for item in self.segment(month).get(str(user_id), {}).get(kind, []):
+                ts = item_ts(kind, item)
+                if (start is None or ts >= start) and (end is None or ts < end):
+                    times.append(ts)
+        return times
+
+    def events(self, kinds, start, end):
+        """(user_id, kind, ts) of every archived record of the given kinds in [start, end)"""
+        events = []
+        for month in self._months_between(start, end):
+            for user_id, user_data in self.segment(month).items():
+                for kind in kinds:
+                    for item in user_data.get(kind, []):
+                        ts = item_ts(kind, item)
+                        if start <= ts < end:
+                            events.append((user_id, kind, ts))
+        return events
+
+    def shifts(self, start, end):
+        """(user_id, start, end) of archived shifts overlapping [start, end)"""
+        intervals = []
+        # Shifts are filed under the month they started in, which may be the one before start
+        for month in self._months_between(start - 31 * 86400, end):
+            for user_id, user_data in self.segment(month).items():
+                for shift in user_data.get('shifts', []):
+                    shift_start = item_ts('shifts', shift)
+                    shift_end = datetime.fromisoformat(shift['end']).timestamp()
+                    if shift_start < end and shift_end > start:
+                        intervals.append((user_id, shift_start, shift_end))
+        return intervals
+
+    # --- Writing ---
+    def write(self, records, cutoff):
+        """Merge {month: {user_id: {kind: [records]}}} into the archive and move the cutoff.
+
+        Every touched month gets a new segment file; the old files are only
+        removed once the index naming the new ones is in place, so a crash
+        at any point leaves either the old or the new archive intact.
+        """
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            generation = self.index.get('generation', 0) + 1
+            segments = dict(self.index['segments'])
+            replaced = []
+            for month, users in records.items():
+                merged = {}
+                old = segments.get(month)
+                if old is not None:
+                    with gzip.open(os.path.join(self.directory, old['file']), 'rt') as f:
+                        merged = json.load(f)
+                    replaced.append(old['file'])
+                for user_id, user_data in users.items():
+                    target = merged.setdefault(user_id, {})
+                    for kind, items in user_data.items():
+                        existing = target.setdefault(kind, [])
+                        seen = {json.dumps(item, sort_keys=True) for item in existing}
+                        existing.extend(item for item in items if json.dumps(item, sort_keys=True) not in seen)
+                        existing.sort(key=lambda item, kind=kind: item_ts(kind, item))
+                filename = f'{month}.{generation}.json.gz'
+                with gzip.open(os.path.join(self.directory, filename), 'wt') as f:
+                    json.dump(merged, f, separators=(',', ':'))
+                segments[month] = {
+                    'file': filename,
+                    'counts': {user_id: {kind: len(items) for kind, items in user_data.items()}
+                               for user_id, user_data in merged.items()},
+                }
+            index = dict(self.index, generation=generation, segments=segments, cutoff=cutoff)
+            self._save_index(index)
+            self.index = index
+            for filename in replaced:
+                self._cache.pop(filename, None)
+                os.remove(os.path.join(self.directory, filename))
+            self._remove_orphans()
+
+    def _remove_orphans(self):
+        """Delete segment files left behind by an archive run that crashed before its index was saved"""
+        live = {entry['file'] for entry in self.index['segments'].values()}
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.json.gz') and filename not in live:
+                os.remove(os.path.join(self.directory, filename))
@@ -0,0 +1,119 @@
+import asyncio
+import itertools
+
+# --- Stand-in Discord objects ---
+# Just enough of the discord.py surface for bot.py's handlers: ids, names,
+# roles, text channels, member lookup and async send(). Nothing touches the
+# network; send() optionally sleeps to model API latency.
+
+_ids = itertools.count(1_000_000_000_000_000)
+
+def next_id():
+    return next(_ids)
+
+class FakePermissions:
+    def __init__(self, administrator=False):
+        self.administrator = administrator
+
+class FakeAsset:
+    url = 'https://cdn.discordapp.com/embed/avatars/0.png'
+
+class FakeSender:
+    send_latency = 0.0
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        if self.send_latency:
+            await asyncio.sleep(self.send_latency)
+        self.sent += 1
+
+class FakeRole:
+    def __init__(self, guild, name):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.members = []
+
+class FakeChannel(FakeSender):
+    def __init__(self, guild, name, channel_id=None):
+        super().__init__()
+        self.id = channel_id or next_id()
+        self.guild = guild
+        self.name = name
+
+class FakeMember(FakeSender):
+    def __init__(self, guild, name, roles=(), administrator=False):
+        super().__init__()
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.display_name = name.title()
+        self.bot = False
+        self.roles = list(roles)
+        self.guild_permissions = FakePermissions(administrator)
+        self.display_avatar = FakeAsset()
+
+    @property
+    def mention(self):
+        return f'<@{self.id}>'
+
+class FakeClientUser:
+    """The bot's own account; commands.Bot reads it to ignore its own messages"""
+
+    def __init__(self, name='ModBot'):
+        self.id = next_id()
+        self.name = name
+        self.bot = True
+
+class FakeGuild:
+    def __init__(self, name, shard_id=0):
+        self.id = next_id()
+        self.name = name
+        self.shard_id = shard_id
+        self.roles = []
+        self.text_channels = []
+        self.members = []
+        self._members = {}
+        self.default_role = self.add_role('@everyone')
+        self.me = None
+
+    def add_role(self, name):
+        role = FakeRole(self, name)
+        self.roles.append(role)
+        return role
+
+    def add_channel(self, name, channel_id=None):
+        channel = FakeChannel(self, name, channel_id)
+        self.text_channels.append(channel)
+        return channel
+
+    def add_member(self, name, roles=(), administrator=False):
+        member = FakeMember(self, name, roles, administrator)
+        self.members.append(member)
+        self._members[member.id] = member
+        for role in roles:
+            role.members.append(member)
+        return member
+
+    def get_member(self, user_id):
+        return self._members.get(user_id)
+
+class FakeMessage:
+    def __init__(self, author, channel, content):
+        self.id = next_id()
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        # discord.ext.commands.Context reads this; no connection state offline
+        self._state = None
+
+class FakeContext(FakeSender):
+    def __init__(self, author, channel):
+        super().__init__()
+        self.author = author
+        self.guild = author.guild
+        self.channel = channel
+        self.message = FakeMessage(author, channel, '')
@@ -0,0 +1,299 @@
+"""Offline replay benchmark for bot.py's handlers.
+
+Builds a fake guild with N mods, seeds H days of history, then drives
+on_message with a paced synthetic stream and runs checkin, the check-in
+deadline callback, weekly_report and admin_stats against it. Nothing
+connects to Discord.
+
+    python benchmarks/replay.py --profile ci
+    python benchmarks/replay.py --profile production --backend sqlite
+    python benchmarks/replay.py --profile ci --compare benchmarks/results/old.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FakeChannel, FakeClientUser, FakeContext, FakeMember, FakeGuild, FakeMessage
+
+PROFILES = {
+    # Small enough for CI: a few seconds end to end
+    'ci': dict(mods=20, members=200, rate=200, duration=5, days=7, checkins_per_day=16, reports=5),
+    # Roughly our largest guild
+    'production': dict(mods=500, members=10_000, rate=2_000, duration=30, days=90, checkins_per_day=16, reports=20),
+}
+
+WORDS = 'ban warn mute spam raid link report ticket appeal rule channel voice role ping'.split()
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def summarize(latencies, elapsed):
+    return {
+        'count': len(latencies),
+        'throughput_per_sec': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        'max_ms': round(max(latencies) * 1000, 3) if latencies else None,
+    }
+
+def disk_bytes(workdir):
+    return sum(os.path.getsize(os.path.join(workdir, name)) for name in os.listdir(workdir)
+               if name.startswith('mod_data'))
+
+def load_bot(workdir, backend):
+    """Import bot.py with its data files inside workdir"""
+    os.environ.setdefault('DISCORD_TOKEN', 'offline-benchmark')
+    os.environ['STORE_BACKEND'] = backend
+    os.chdir(workdir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import bot
+    return bot
+
+# --- World ---
+def build_world(bot, config):
+    guild = FakeGuild('Benchmark Guild')
+    role = guild.add_role(bot.MOD_ROLE_NAME)
+    guild.add_channel(bot.SHIFT_LOG_CHANNEL_NAME)
+    monitored = [guild.add_channel(f'monitored-{i}', channel_id)
+                 for i, channel_id in enumerate(bot.MONITORED_CHANNEL_IDS)]
+    general = guild.add_channel('general')
+    mods = [guild.add_member(f'mod{i}', [role]) for i in range(config['mods'])]
+    for i in range(max(0, config['members'] - config['mods'])):
+        guild.add_member(f'member{i}')
+    admin = guild.add_member('admin', administrator=True)
+
+    bot.bot.get_guild = {guild.id: guild}.get
+    # Never logged in, so stand in for the account process_commands compares authors with
+    bot.bot._connection.user = FakeClientUser()
+    bot.resolver.refresh(guild)
+    bot.member_names.build(guild)
+    return guild, mods, admin, monitored, general
+
+def seed_history(bot, guild, mods, config, now):
+    """Write H days of shifts, check-ins and misses straight into the backend"""
+    history = {}
+    interval = bot.CHECKIN_INTERVAL
+    for mod in mods:
+        user = history[str(mod.id)] = {'shifts': [], 'missed': [], 'checkins': [], 'recent_messages': []}
+        for day in range(config['days'], 0, -1):
+            start = now - day * 86400 + 9 * 3600
+            user['shifts'].append({'start': iso(bot, start), 'end': iso(bot, start + 8 * 3600)})
+            for i in range(config['checkins_per_day']):
+                user['checkins'].append(iso(bot, start + (i + 1) * interval))
+            user['missed'].append(iso(bot, start + 7 * 3600))
+        # Every mod is on shift now and due to check in
+        user['shifts'].append({'start': iso(bot, now - 2 * interval), 'end': None})
+        user['checkins'].append(iso(bot, now - interval - 60))
+
+    from storage import JournalStore, write_atomic
+    if isinstance(bot.store, JournalStore):
+        write_atomic(bot.store.path, history)
+        bot.store.load()
+    else:
+        bot.store.import_json(history, guild.id)
+
+def iso(bot, ts):
+    return datetime.fromtimestamp(ts, bot.PKT).isoformat()
+
+# --- Phases ---
+async def sample_loop_lag(samples, stop, interval=0.01):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval))
+
+async def replay_messages(bot, guild, mods, monitored, general, config):
+    authors = mods + random.sample(guild.members, min(len(guild.members), 200))
+    latencies = []
+    tick = 0.01
+    per_tick = config['rate'] * tick
+    owed = 0.0
+    started = time.perf_counter()
+    deadline = started + config['duration']
+    with contextlib.redirect_stdout(io.StringIO()):
+        while time.perf_counter() < deadline:
+            tick_start = time.perf_counter()
+            owed += per_tick
+            while owed >= 1:
+                owed -= 1
+                channel = random.choice(monitored) if random.random() < 0.7 else general
+                content = ' '.join(random.choices(WORDS, k=random.randint(3, 12)))
+                message = FakeMessage(random.choice(authors), channel, content)
+                t0 = time.perf_counter()
+                await bot.on_message(message)
+                latencies.append(time.perf_counter() - t0)
+            await asyncio.sleep(max(0.0, tick - (time.perf_counter() - tick_start)))
+    return latencies, time.perf_counter() - started
+
+async def run_each(coro_factory, items):
+    latencies = []
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for item in items:
+            t0 = time.perf_counter()
+            await coro_factory(item)
+            latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - started
+
+async def benchmark(bot, config, workdir):
+    now = time.time()
+    guild, mods, admin, monitored, general = build_world(bot, config)
+
+    t0 = time.perf_counter()
+    seed_history(bot, guild, mods, config, now)
+    await bot.rollups.rebuild(bot.store)
+    bot.activity.load(await bot.store.load_activity(now - 3600))
+    seed_seconds = time.perf_counter() - t0
+
+    bot.notifier.start()
+    store_task = asyncio.create_task(bot.store.run())
+    results = {'seed_seconds': round(seed_seconds, 3), 'handlers': {}}
+    bytes_before = disk_bytes(workdir)
+
+    lag_samples = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(sample_loop_lag(lag_samples, stop))
+    phases = results['handlers']
+
+    phases['on_message'] = summarize(*await replay_messages(bot, guild, mods, monitored, general, config))
+    phases['checkin'] = summarize(*await run_each(
+        lambda mod: bot.checkin.callback(FakeContext(mod, general)), mods))
+    base = time.time() - bot.CHECKIN_INTERVAL
+    phases['check_in_reminder:remind'] = summarize(*await run_each(
+        lambda mod: bot.check_in_reminder(mod.id, guild.id, 'remind', base), mods))
+    phases['check_in_reminder:miss'] = summarize(*await run_each(
+        lambda mod: bot.check_in_reminder(mod.id, guild.id, 'miss', base), mods))
+    t0 = time.perf_counter()
+    await bot.notifier.queue.join()
+    results['dm_drain_seconds'] = round(time.perf_counter() - t0, 3)
+    phases['weekly_report'] = summarize(*await run_each(
+        lambda _: bot.weekly_report.callback(FakeContext(admin, general)), range(config['reports'])))
+    bot.mod_summary_cache.clear()
+    phases['admin_stats'] = summarize(*await run_each(
+        lambda _: bot.admin_stats.callback(FakeContext(admin, general)), range(config['reports'])))
+
+    stop.set()
+    await lag_task
+    await bot.store.flush()
+    store_task.cancel()
+    results['persistence_bytes_written'] = disk_bytes(workdir) - bytes_before
+    results['loop_lag'] = {
+        'p50_ms': round(percentile(lag_samples, 0.50) * 1000, 3) if lag_samples else None,
+        'p99_ms': round(percentile(lag_samples, 0.99) * 1000, 3) if lag_samples else None,
+        'max_ms': round(max(lag_samples) * 1000, 3) if lag_samples else None,
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot.store.close()
+    results['disk_bytes'] = disk_bytes(workdir)
+    return results
+
+# --- Reporting ---
+def compare(current, previous):
+    print(f"\nCompared with {previous.get('started_at')} ({previous.get('git', 'unknown')}):")
+    for name, stats in current['handlers'].items():
+        old = previous.get('handlers', {}).get(name)
+        if not old:
+            continue
+        for key in ('p50_ms', 'p99_ms'):
+            if stats[key] is None or not old.get(key):
+                continue
+            change = (stats[key] - old[key]) / old[key] * 100
+            print(f"  {name:28} {key}: {old[key]:10.3f} -> {stats[key]:10.3f} ({change:+.1f}%)")
+
+def git_revision():
+    with contextlib.suppress(Exception):
+        with open(os.path.join(REPO_ROOT, '.git', 'HEAD')) as f:
+            head = f.read().strip()
+        if head.startswith('ref: '):
+            with open(os.path.join(REPO_ROOT, '.git', head[5:])) as f:
+                return f.read().strip()[:12]
+        return head[:12]
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='ci')
+    parser.add_argument('--backend', choices=('json', 'sqlite'), default='json')
+    parser.add_argument('--mods', type=int, help='Override the number of mods')
+    parser.add_argument('--members', type=int, help='Override the guild member count')
+    parser.add_argument('--rate', type=int, help='Override messages per second')
+    parser.add_argument('--duration', type=float, help='Override seconds of message replay')
+    parser.add_argument('--days', type=int, help='Override days of seeded history')
+    parser.add_argument('--dm-latency', type=float, default=0.05, help='Simulated DM send latency in seconds')
+    parser.add_argument('--tracemalloc', action='store_true', help='Report Python heap peak (slows the run)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Where to write the JSON results')
+    parser.add_argument('--compare', help='Previous results JSON to compare against')
+    args = parser.parse_args()
+
+    config = dict(PROFILES[args.profile])
+    for key in ('mods', 'members', 'rate', 'duration', 'days'):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+    random.seed(args.seed)
+    FakeMember.send_latency = FakeChannel.send_latency = args.dm_latency
+
+    started_at = datetime.now().strftime('%Y%m%d-%H%M%S')
+    output = os.path.abspath(args.output or os.path.join(
+        REPO_ROOT, 'benchmarks', 'results', f'{args.profile}-{args.backend}-{started_at}.json'))
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    with tempfile.TemporaryDirectory(prefix='modbot-bench-') as workdir:
+        bot = load_bot(workdir, args.backend)
+        results = asyncio.run(benchmark(bot, config, workdir))
+        os.chdir(REPO_ROOT)
+
+    results = {
+        'profile': args.profile,
+        'backend': args.backend,
+        'config': config,
+        'started_at': started_at,
+        'git': git_revision(),
+        'python': platform.python_version(),
+        **results,
+        'memory': {'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss},
+    }
+    if args.tracemalloc:
+        results['memory']['python_heap_peak_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"Profile {args.profile} ({args.backend}): {config}")
+    for name, stats in results['handlers'].items():
+        print(f"  {name:28} n={stats['count']:<7} {stats['throughput_per_sec'] or 0:>10.1f}/s "
+              f"p50={stats['p50_ms']}ms p99={stats['p99_ms']}ms")
+    print(f"  loop lag p99={results['loop_lag']['p99_ms']}ms, "
+          f"persistence {results['persistence_bytes_written']} bytes, "
+          f"max RSS {results['memory']['max_rss_kb']} KB")
+    print(f"Results written to {output}")
+    if previous:
+        compare(results, previous)
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,48 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import os
-import json
-from datetime import datetime, timedelta
+import io
+import math
+import resource
+import time
+from datetime import date, datetime, timedelta
 import pytz
 import asyncio
 from aiohttp import web
+from storage import open_store
+from activity import ActivityIndex
+from analytics import HEATMAP_KINDS, WEEKDAYS, build_report, render_heatmap
+from scheduler import DeadlineScheduler
+from rollups import DailyRollups
+from notifier import DMDispatcher
+from resolver import GuildResolver
+from guild_config import GuildConfigs, GuildSettings
+from members import MemberNameIndex, EmbedPaginator
+from cluster import ClusterIPC, cluster_for_guild
+from metrics import Registry, monitor_loop_lag
+from logs import get_logger, setup_logging
+from profiling import SlowCallLog, capture_profile, profile_busy
+from reporting import JsonStream, ReportError, ReportingAPI
+from leases import LeaseManager, SQLiteLeases
+
+# JSON-lines logging written by a background thread, see logs.py
+setup_logging()
+log = get_logger('modbot')
+
+# Seconds since import at each startup milestone, logged once reminders are armed
+BOOT_STARTED = time.perf_counter()
+startup_timings = {}
+
+def mark_startup(phase):
+    startup_timings.setdefault(phase, round(time.perf_counter() - BOOT_STARTED, 3))
+
+# Event handlers, commands and task iterations slower than SLOW_CALL_MS are kept for *debug
+slow_calls = SlowCallLog(threshold=int(os.getenv('SLOW_CALL_MS', '250')) / 1000)
 
 # Get token from environment variable only (for security)
 TOKEN = os.getenv('DISCORD_TOKEN')
 if not TOKEN:
-    print("❌ Error: DISCORD_TOKEN environment variable not set!")
-    print("Please set your Discord bot token as an environment variable.")
+    log.error('missing_token', hint='Set the DISCORD_TOKEN environment variable to your bot token')
     exit(1)
 
 INTENTS = discord.Intents.default()
@@ -20,275 +51,711 @@ INTENTS.guilds = True
 INTENTS.members = True
 INTENTS.message_content = True
 
-bot = commands.Bot(command_prefix='*', intents=INTENTS)
+# MEMBER_CACHE=lean skips chunking every guild at startup and caches no
+# members; mods are fetched by id once ready and kept by the resolver, see
+# resolver.py. Joins are not cached, a new mod is learned from their first
+# command. The default keeps every member.
+MEMBER_CACHE = os.getenv('MEMBER_CACHE', 'full')
+bot_options = {}
+if MEMBER_CACHE == 'lean':
+    bot_options = {'chunk_guilds_at_startup': False, 'member_cache_flags': discord.MemberCacheFlags.none()}
+
+# Sharding: set SHARD_COUNT to run an AutoShardedBot, or start cluster.py
+# to split the shards over several processes (it sets the CLUSTER_* vars)
+CLUSTER_ID = int(os.getenv('CLUSTER_ID', '0'))
+CLUSTER_COUNT = int(os.getenv('CLUSTER_COUNT', '1'))
+SHARD_COUNT = os.getenv('SHARD_COUNT')
+SHARD_IDS = os.getenv('SHARD_IDS')
+
+if SHARD_COUNT:
+    shard_ids = [int(shard_id) for shard_id in SHARD_IDS.split(',')] if SHARD_IDS else None
+    bot = commands.AutoShardedBot(command_prefix='*', intents=INTENTS,
+                                  shard_count=int(SHARD_COUNT), shard_ids=shard_ids, **bot_options)
+else:
+    bot = commands.Bot(command_prefix='*', intents=INTENTS, **bot_options)
 
 MOD_ROLE_NAME = 'shitty mod'
 SHIFT_LOG_CHANNEL_NAME = 'mod-shift-logs'
 MONITORED_CHANNEL_IDS = [1334854378686910475, 1234620156383203482]
 DATA_FILE = 'mod_data.json'
+SQLITE_FILE = os.getenv('SQLITE_PATH', 'mod_data.db')
+if CLUSTER_COUNT > 1:
+    # Each cluster keeps the data for its own guilds
+    DATA_FILE = f'mod_data.{CLUSTER_ID}.json'
+    SQLITE_FILE = f'{os.path.splitext(SQLITE_FILE)[0]}.{CLUSTER_ID}.db'
+STORE_BACKEND = os.getenv('STORE_BACKEND', 'json')
 PKT = pytz.timezone('Asia/Karachi')
+CHECKIN_INTERVAL = 25 * 60  # seconds between check-ins
+GRACE_PERIOD = 5 * 60  # seconds after the interval before a check-in counts as missed
+DAILY_MISS_LIMIT = 2
+
+# Per-guild overrides of the settings above, changed with *config, see guild_config.py
+guild_configs = GuildConfigs(os.getenv('GUILD_CONFIG_PATH', 'guild_config.json'), GuildSettings(
+    role_name=MOD_ROLE_NAME,
+    log_channel_name=SHIFT_LOG_CHANNEL_NAME,
+    monitored_channels=MONITORED_CHANNEL_IDS,
+    checkin_interval=CHECKIN_INTERVAL,
+    grace_period=GRACE_PERIOD,
+    miss_limit=DAILY_MISS_LIMIT,
+)).load()
+guild_config_task = None
+
+def guild_names(guild_id):
+    settings = guild_configs.get(guild_id)
+    return settings.role_name, settings.log_channel_name
+
+# Per-guild cache of the mod role, shift log channel and mod member ids
+resolver = GuildResolver(guild_names, lean=MEMBER_CACHE == 'lean')
+guild_configs.listeners.append(resolver.invalidate)
+
+# Case-insensitive name/display name index for admin_stats lookups
+member_names = MemberNameIndex()
+
+# Sorted all-mods summaries for admin_stats, {guild_id: (expires, rows)}
+mod_summary_cache = {}
+MOD_SUMMARY_TTL = 60
+MOD_SUMMARY_PAGE_SIZE = 10
+
+# Longest range *analytics covers
+ANALYTICS_MAX_DAYS = 90
+
+# Longest *profile capture; the profiler slows everything down while it runs
+PROFILE_MAX_SECONDS = 60
+
+# --- Cluster IPC ---
+ipc = ClusterIPC(CLUSTER_ID, CLUSTER_COUNT, int(os.getenv('IPC_BASE_PORT', '8100')), os.getenv('IPC_SECRET', ''))
+ipc_started = False
+
+def shard_status():
+    """Gateway status of every shard this process runs"""
+    if isinstance(bot, commands.AutoShardedBot):
+        shards = {shard_id: shard for shard_id, shard in bot.shards.items()}
+    else:
+        shards = {0: None}
+    status = {}
+    for shard_id, shard in shards.items():
+        closed = shard.is_closed() if shard else bot.is_closed()
+        latency = shard.latency if shard else bot.latency
+        status[shard_id] = {
+            'connected': bot.is_ready() and not closed,
+            'latency_ms': round(latency * 1000, 1) if math.isfinite(latency) else None,
+            'guilds': sum(1 for guild in bot.guilds if (guild.shard_id or 0) == shard_id),
+        }
+    return status
+
+def reminders_running():
+    return reminder_task is not None and not reminder_task.done()
+
+@ipc.handler('health')
+async def process_health():
+    return {'shards': shard_status(), 'reminders_running': reminders_running()}
+
+@ipc.handler('report')
+async def cluster_report():
+    """Guild, mod and weekly check-in/miss totals for this process"""
+    today = rollups.today()
+    weekly = rollups.summary(None, ('checkins', 'missed'), today - 6, today)
+    return {
+        'guilds': len(bot.guilds),
+        'mods': sum(len(resolver.mod_ids(guild)) for guild in bot.guilds),
+        'on_shift': len(reminders),
+        'checkins_7d': sum(counts['checkins'] for counts in weekly.values()),
+        'missed_7d': sum(counts['missed'] for counts in weekly.values()),
+    }
+
+# --- Reporting API ---
+# Read-only JSON reports for dashboards, see reporting.py. Only served when
+# REPORT_API_TOKEN is set.
+REPORT_API_TOKEN = os.getenv('REPORT_API_TOKEN')
+REPORT_MAX_DAYS = 366
+REPORT_STREAM_EVENTS = 2000  # history responses with more events are streamed, not cached
+
+async def forward_report(name, params, if_none_match):
+    """Render reports for guilds that another cluster owns in that process"""
+    if CLUSTER_COUNT <= 1 or not params.get('guild_id', '').isdigit():
+        return None
+    owner = cluster_for_guild(int(params['guild_id']), CLUSTER_COUNT, int(SHARD_COUNT or CLUSTER_COUNT))
+    if owner == CLUSTER_ID:
+        return None
+    result = await ipc.call(owner, 'render_report', report=name, if_none_match=if_none_match or '', **params)
+    if 'status' not in result:
+        return 502, None, {'error': result.get('error', 'cluster unavailable')}
+    return result['status'], result['etag'], result['payload']
+
+reporting = ReportingAPI(REPORT_API_TOKEN, lambda: store.version, forward=forward_report)
+
+@ipc.handler('render_report')
+async def render_report(report, if_none_match='', **params):
+    status, etag, payload = await reporting.render(report, params, if_none_match or None)
+    if isinstance(payload, JsonStream):
+        payload = payload.collect()
+    return {'status': status, 'etag': etag, 'payload': payload}
+
+def report_guild(params):
+    guild = bot.get_guild(int(params['guild_id'])) if params['guild_id'].isdigit() else None
+    if guild is None:
+        raise ReportError(404, 'Unknown guild')
+    return guild
+
+def day_start(day):
+    return PKT.localize(datetime.combine(day, datetime.min.time())).timestamp()
+
+@reporting.report('mods', '/api/guilds/{guild_id}/mods',
+                  key=lambda params: tuple(sorted(resolver.mod_ids(report_guild(params)))))
+async def mods_report(params):
+    """Every mod in the guild with all-time shift, check-in and miss totals"""
+    guild = report_guild(params)
+    mods = []
+    for member in sorted(resolver.mods(guild), key=lambda member: member.display_name.lower()):
+        totals = await store.totals(guild.id, member.id)
+        mods.append({'user_id': str(member.id), 'name': member.display_name, **totals})
+    return {'guild_id': str(guild.id), 'mods': mods}
+
+@reporting.report('weekly', '/api/guilds/{guild_id}/weekly', key=lambda params: rollups.today())
+async def weekly_report_api(params):
+    """Check-ins and misses per member over the last 7 days, the *weekly_report data"""
+    guild = report_guild(params)
+    today = rollups.today()
+    mods = []
+    for user_id, counts in rollups.summary(guild.id, ('checkins', 'missed'), today - 6, today).items():
+        member = resolver.member(guild, int(user_id))
+        if member:
+            mods.append({'user_id': str(member.id), 'name': member.display_name, **counts})
+    return {
+        'guild_id': str(guild.id),
+        'from': date.fromordinal(today - 6).isoformat(),
+        'to': date.fromordinal(today).isoformat(),
+        'mods': mods,
+    }
+
+@reporting.report('history', '/api/guilds/{guild_id}/users/{user_id}/history', key=lambda params: rollups.today())
+async def history_report(params):
+    """A user's shifts, check-ins and misses between ?from= and ?to= (YYYY-MM-DD, inclusive, default last 30 days)"""
+    guild = report_guild(params)
+    try:
+        user_id = int(params['user_id'])
+        last = date.fromisoformat(params['to']) if 'to' in params else date.fromordinal(rollups.today())
+        first = date.fromisoformat(params['from']) if 'from' in params else last - timedelta(days=29)
+    except ValueError:
+        raise ReportError(400, 'user_id must be a user id and from/to dates as YYYY-MM-DD')
+    if last < first or (last - first).days >= REPORT_MAX_DAYS:
+        raise ReportError(400, f'from/to must be a range of at most {REPORT_MAX_DAYS} days')
+
+    start, end = day_start(first), day_start(last + timedelta(days=1))
+    counts, events = {}, []
+    for kind in ('shifts', 'checkins', 'missed'):
+        times = await store.event_times(guild.id, user_id, kind, start, end)
+        counts[kind] = len(times)
+        events.extend({'kind': kind, 'ts': ts} for ts in times)
+    events.sort(key=lambda event: event['ts'])
+    head = {'guild_id': str(guild.id), 'user_id': str(user_id),
+            'from': first.isoformat(), 'to': last.isoformat(), 'counts': counts}
+    if len(events) > REPORT_STREAM_EVENTS:
+        return JsonStream(head, 'events', events)
+    return dict(head, events=events)
 
 # --- Web Server for Healthcheck ---
 async def healthcheck(request):
     return web.Response(text="Bot is running!", status=200)
 
+async def readiness(request):
+    """Per-shard status across every cluster, 503 unless every gateway is connected and reminders are running"""
+    clusters = await ipc.gather('health')
+    ready = all(
+        'error' not in health and health['reminders_running']
+        and all(shard['connected'] for shard in health['shards'].values())
+        for health in clusters.values()
+    )
+    return web.json_response({'ready': ready, 'clusters': clusters}, status=200 if ready else 503)
+
+async def metrics_endpoint(request):
+    return web.Response(text=metrics.render(), content_type='text/plain', charset='utf-8',
+                        headers={'X-Prometheus-Format': '0.0.4'})
+
 async def start_web_server():
     app = web.Application()
     app.router.add_get('/', healthcheck)
-    app.router.add_get('/health', healthcheck)
+    app.router.add_get('/health', readiness)
+    app.router.add_get('/metrics', metrics_endpoint)
+    if REPORT_API_TOKEN:
+        reporting.add_routes(app)
     
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, '0.0.0.0', 8080)
     await site.start()
-    print("✅ Web server started on port 8080 for healthcheck")
+    log.info('web_server_started', port=8080)
 
 # --- Data Persistence ---
-def load_data():
-    if not os.path.exists(DATA_FILE):
-        return {}
-    try:
-        with open(DATA_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {}
+# STORE_BACKEND picks mod_data.json (journaled) or SQLite, see storage.py
+store = open_store(
+    STORE_BACKEND,
+    DATA_FILE,
+    SQLITE_FILE,
+    PKT,
+    flush_interval=float(os.getenv('JOURNAL_FLUSH_INTERVAL', '1.0')),
+    durability=os.getenv('JOURNAL_DURABILITY', 'async'),
+    compact_every=int(os.getenv('JOURNAL_COMPACT_EVERY', '5000')),
+    retention_months=int(os.getenv('RETENTION_MONTHS', '2')),
+    snapshot_format=os.getenv('SNAPSHOT_FORMAT', 'json'),
+)
+mark_startup('store_loaded')
+store_task = None
 
-def save_data(data):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+# In-memory ring of recent monitored-channel messages per mod, see activity.py
+activity = ActivityIndex(capacity=100)
 
-data = load_data()
+# Per-user daily shift/check-in/miss counters, see rollups.py
+rollups = DailyRollups(PKT, per_guild=store.per_guild)
 
 # --- Helper Functions ---
 def get_now():
     return datetime.now(PKT)
 
-def format_time(time_str):
-    """Format time string to readable format without seconds"""
+def format_time(value):
+    """Format an epoch timestamp or time string to readable format without seconds"""
     try:
-        dt = datetime.fromisoformat(time_str)
+        if isinstance(value, (int, float)):
+            dt = datetime.fromtimestamp(value, PKT)
+        else:
+            dt = datetime.fromisoformat(value)
         return dt.strftime("%d %B %Y, %I:%M %p PKT")
     except:
-        return time_str
+        return str(value)
 
-def check_mod_activity_in_channels(user_id, minutes=25):
-    """Check if mod sent messages in monitored channels in last X minutes (default 25)"""
-    now = get_now()
-    user_data = data.get(str(user_id), {})
-    recent_messages = user_data.get('recent_messages', [])
-    recent_activity = []
-    for msg in recent_messages:
-        try:
-            msg_time = datetime.fromisoformat(msg['timestamp'])
-            if (now - msg_time) <= timedelta(minutes=25):
-                recent_activity.append(msg)
-        except:
-            continue
-    return len(recent_activity) > 0, recent_activity
+def check_mod_activity_in_channels(user_id, minutes):
+    """Check if mod sent messages in monitored channels in last X minutes"""
+    since = get_now().timestamp() - minutes * 60
+    activity_count = activity.count_since(user_id, since)
+    return activity_count > 0, activity_count
 
-def can_checkin(user_id):
-    """Check if user can check-in (25 minutes since last check-in)"""
-    user_data = data.get(str(user_id), {})
-    checkins = user_data.get('checkins', [])
-    if not checkins:
+async def can_checkin(guild_id, user_id):
+    """Check if user can check-in (one check-in interval since the last one)"""
+    last_checkin = await store.last_event(guild_id, user_id, 'checkins')
+    if last_checkin is None:
         return True, None
-    last_checkin = datetime.fromisoformat(checkins[-1])
-    now = get_now()
-    time_since_last = now - last_checkin
-    if time_since_last < timedelta(minutes=25):
-        remaining = timedelta(minutes=25) - time_since_last
+    interval = timedelta(seconds=guild_configs.get(guild_id).checkin_interval)
+    time_since_last = timedelta(seconds=get_now().timestamp() - last_checkin)
+    if time_since_last < interval:
+        remaining = interval - time_since_last
         return False, remaining
     return True, None
 
-def get_todays_missed_checkins(user_id):
+def get_todays_missed_checkins(guild_id, user_id):
     """Get number of missed check-ins for today"""
-    user_data = data.get(str(user_id), {})
-    today = get_now().date()
-    missed_today = 0
-    
-    for missed_time in user_data.get('missed', []):
-        try:
-            missed_date = datetime.fromisoformat(missed_time).date()
-            if missed_date == today:
-                missed_today += 1
-        except:
-            continue
-    
-    return missed_today
+    return rollups.count_today(guild_id, user_id, 'missed')
 
 # --- Check-In Reminder Task ---
-@tasks.loop(minutes=1)
-async def check_in_reminder():
-    now = get_now()
-    for guild in bot.guilds:
-        role = discord.utils.get(guild.roles, name=MOD_ROLE_NAME)
-        if not role:
+def find_mod(user_id, guild_id):
+    """Member object for a mod, looked up in guild_id or any guild when it is unknown"""
+    guilds = [bot.get_guild(guild_id)] if guild_id else bot.guilds
+    for guild in guilds:
+        if not guild:
             continue
-        for mod in role.members:
-            user_data = data.setdefault(str(mod.id), {'shifts': [], 'missed': [], 'checkins': [], 'recent_messages': []})
-            # Check if mod is currently on shift
-            on_shift = False
-            for shift in reversed(user_data['shifts']):
-                if shift['end'] is None:  # Shift is ongoing
-                    on_shift = True
-                    break
-            if not on_shift:
-                continue  # Skip if not on shift
-            
-            # Check last check-in time
-            last_checkin = None
-            if user_data['checkins']:
-                last_checkin = datetime.fromisoformat(user_data['checkins'][-1])
-            
-            # If no check-in or check-in was more than 25 minutes ago
-            if not last_checkin or (now - last_checkin) > timedelta(minutes=25):
-                # Check if they're within the 5-minute grace period
-                grace_period_expired = last_checkin and (now - last_checkin) > timedelta(minutes=30)  # 25 + 5
-                
-                if grace_period_expired:
-                    # Grace period expired, log as missed
-                    if not user_data['missed'] or (user_data['missed'] and (now - datetime.fromisoformat(user_data['missed'][-1])) > timedelta(minutes=1)):
-                        user_data['missed'].append(now.isoformat())
-                        save_data(data)
-                        
-                        # Check how many misses today
-                        missed_today = get_todays_missed_checkins(mod.id)
-                        
-                        embed = discord.Embed(
-                            title="❌ Check-in Missed!",
-                            description=f"You missed your check-in! You now have **{missed_today} missed check-in(s)** today.",
-                            color=0xff0000
-                        )
-                        embed.add_field(name="🕐 Last Check-in", value=format_time(last_checkin.isoformat()) if last_checkin else "None", inline=True)
-                        embed.add_field(name="⚠️ Warning", value=f"You have {missed_today} missed check-in(s) today. Max allowed: 2", inline=True)
-                        
-                        if missed_today >= 2:
-                            embed.add_field(name="🚨 Critical", value="You have reached the maximum allowed missed check-ins for today!", inline=False)
-                        
-                        await mod.send(embed=embed)
-                else:
-                    # Still in grace period, send reminder
-                    has_activity, recent_messages = check_mod_activity_in_channels(mod.id, 25)
-                    try:
-                        if has_activity:
-                            embed = discord.Embed(
-                                title="⏰ Check-in Reminder!",
-                                description="You've been active in monitored channels. Please check-in now!",
-                                color=0xffa500
-                            )
-                            embed.add_field(name="🕐 Last Check-in", value=format_time(last_checkin.isoformat()) if last_checkin else "None", inline=True)
-                            embed.add_field(name="📝 Recent Activity", value=f"{len(recent_messages)} messages in monitored channels", inline=True)
-                            embed.add_field(name="⏰ Grace Period", value="You have 5 minutes to check-in before it's marked as missed!", inline=True)
-                            embed.add_field(name="✅ Action Required", value="Use `*checkin` to check-in", inline=False)
-                            await mod.send(embed=embed)
-                        else:
-                            embed = discord.Embed(
-                                title="⚠️ Activity Required!",
-                                description="You need to send messages in monitored channels before checking in!",
-                                color=0xff0000
-                            )
-                            embed.add_field(name="🕐 Last Check-in", value=format_time(last_checkin.isoformat()) if last_checkin else "None", inline=True)
-                            embed.add_field(name="📝 Required Action", value="Send at least 1 message in monitored channels", inline=True)
-                            embed.add_field(name="⏰ Grace Period", value="You have 5 minutes to check-in before it's marked as missed!", inline=True)
-                            embed.add_field(name="📋 Monitored Channels", value=f"<#{MONITORED_CHANNEL_IDS[0]}> and <#{MONITORED_CHANNEL_IDS[1]}>", inline=False)
-                            embed.add_field(name="✅ Next Step", value="After sending a message, use `*checkin`", inline=False)
-                            await mod.send(embed=embed)
-                    except Exception as e:
-                        print(f"Error sending reminder to {mod.name}: {e}")
+        if user_id in resolver.mod_ids(guild):
+            return resolver.member(guild, user_id)
+    return None
+
+def settings_for(guild_id, user_id):
+    """Settings of the guild a mod is on shift in; the JSON store does not record the guild"""
+    if guild_id is None:
+        mod = find_mod(user_id, None)
+        guild_id = mod.guild.id if mod else None
+    return guild_configs.get(guild_id)
+
+def arm_reminder(user_id, guild_id, base):
+    """Schedule the next reminder for a check-in window starting at base"""
+    interval = settings_for(guild_id, user_id).checkin_interval
+    reminders.schedule(user_id, guild_id, 'remind', base + interval, base)
+
+def rearm_reminder(user_id, guild_id, base):
+    """Re-arm a window that is already under way after its timings changed"""
+    settings = settings_for(guild_id, user_id)
+    remind_at = base + settings.checkin_interval
+    if get_now().timestamp() < remind_at:
+        reminders.schedule(user_id, guild_id, 'remind', remind_at, base)
+    else:
+        # This window's reminder has gone out already, only its miss is left
+        reminders.schedule(user_id, guild_id, 'miss', remind_at + settings.grace_period, base)
+
+async def window_base(guild_id, user_id, start):
+    """Start of the current check-in window: shift start, last check-in or last miss"""
+    last_checkin = await store.last_event(guild_id, user_id, 'checkins') or 0
+    last_missed = await store.last_event(guild_id, user_id, 'missed') or 0
+    return max(start, last_checkin, last_missed)
+
+@slow_calls.timed()
+async def rebuild_reminders(partitions=None):
+    """Re-arm deadlines for every open shift after a restart, or for the given lease partitions"""
+    for guild_id, user_id, start in await store.open_shifts():
+        if partitions is None or leases.partition(user_id) in partitions:
+            arm_reminder(user_id, guild_id, await window_base(guild_id, user_id, start))
+    log.info('reminders_rebuilt', on_shift=len(reminders), partitions=sorted(partitions) if partitions else None)
+
+async def follow_reminder(user_id, guild_id):
+    """Track a mod whose deadline another replica handles, so we can take over if it goes away"""
+    start = await store.open_shift(guild_id, user_id)
+    if start is None:
+        return
+    base = await window_base(guild_id, user_id, start)
+    # The owner's writes may not be visible yet; look again after a lease period
+    when = max(base + settings_for(guild_id, user_id).checkin_interval, get_now().timestamp() + leases.ttl)
+    reminders.schedule(user_id, guild_id, 'remind', when, base)
+
+@slow_calls.timed()
+async def check_in_reminder(user_id, guild_id, kind, base):
+    """Deadline callback: 'remind' at base + the check-in interval, 'miss' once the grace period is over too"""
+    REMINDERS_FIRED.inc(kind=kind)
+    with REMINDER_SECONDS.time(kind=kind):
+        await handle_deadline(user_id, guild_id, kind, base)
+
+async def handle_deadline(user_id, guild_id, kind, base):
+    mod = find_mod(user_id, guild_id)
+    if mod is None or await store.open_shift(guild_id, user_id) is None:
+        return  # No longer a mod or no longer on shift, let the deadline lapse
+    if leases is not None and not leases.owns(user_id):
+        await follow_reminder(user_id, guild_id)
+        return
+    settings = guild_configs.get(mod.guild.id)
+    if leases is not None and not await leases.claim(user_id, f'{kind}:{base}'):
+        # The replica that held the partition before us already handled this deadline.
+        # Keep the chain going; the next deadline is claimed too, so nothing is sent twice.
+        if kind == 'remind':
+            reminders.schedule(user_id, guild_id, 'miss', base + settings.checkin_interval + settings.grace_period, base)
+        else:
+            await follow_reminder(user_id, guild_id)
+        return
+    now = get_now()
+    last_checkin = await store.last_event(guild_id, user_id, 'checkins')
+    if last_checkin is not None:
+        last_checkin = datetime.fromtimestamp(last_checkin, PKT)
+    
+    if kind == 'miss':
+        # Grace period expired, log as missed and start a new window
+        await store.add_missed(guild_id, user_id, now.timestamp())
+        rollups.add(guild_id, user_id, 'missed', now.timestamp())
+        arm_reminder(user_id, guild_id, now.timestamp())
+        
+        # Check how many misses today
+        missed_today = get_todays_missed_checkins(guild_id, user_id)
+        
+        embed = discord.Embed(
+            title="❌ Check-in Missed!",
+            description=f"You missed your check-in! You now have **{missed_today} missed check-in(s)** today.",
+            color=0xff0000
+        )
+        embed.add_field(name="🕐 Last Check-in", value=format_time(last_checkin.isoformat()) if last_checkin else "None", inline=True)
+        embed.add_field(name="⚠️ Warning", value=f"You have {missed_today} missed check-in(s) today. Max allowed: {settings.miss_limit}", inline=True)
+        
+        if missed_today >= settings.miss_limit:
+            embed.add_field(name="🚨 Critical", value="You have reached the maximum allowed missed check-ins for today!", inline=False)
+        
+        notifier.submit(mod, 'miss', embed)
+        return
+    
+    # Still in grace period, send reminder and arm the miss deadline
+    reminders.schedule(user_id, guild_id, 'miss', base + settings.checkin_interval + settings.grace_period, base)
+    has_activity, activity_count = check_mod_activity_in_channels(user_id, settings.checkin_minutes)
+    if has_activity:
+        embed = discord.Embed(
+            title="⏰ Check-in Reminder!",
+            description="You've been active in monitored channels. Please check-in now!",
+            color=0xffa500
+        )
+        embed.add_field(name="🕐 Last Check-in", value=format_time(last_checkin.isoformat()) if last_checkin else "None", inline=True)
+        embed.add_field(name="📝 Recent Activity", value=f"{activity_count} messages in monitored channels", inline=True)
+        embed.add_field(name="⏰ Grace Period", value=f"You have {settings.grace_minutes} minutes to check-in before it's marked as missed!", inline=True)
+        embed.add_field(name="✅ Action Required", value="Use `*checkin` to check-in", inline=False)
+        notifier.submit(mod, 'remind', embed)
+    else:
+        embed = discord.Embed(
+            title="⚠️ Activity Required!",
+            description="You need to send messages in monitored channels before checking in!",
+            color=0xff0000
+        )
+        embed.add_field(name="🕐 Last Check-in", value=format_time(last_checkin.isoformat()) if last_checkin else "None", inline=True)
+        embed.add_field(name="📝 Required Action", value="Send at least 1 message in monitored channels", inline=True)
+        embed.add_field(name="⏰ Grace Period", value=f"You have {settings.grace_minutes} minutes to check-in before it's marked as missed!", inline=True)
+        embed.add_field(name="📋 Monitored Channels", value=channel_mentions(settings), inline=False)
+        embed.add_field(name="✅ Next Step", value="After sending a message, use `*checkin`", inline=False)
+        notifier.submit(mod, 'remind', embed)
+
+def channel_mentions(settings):
+    return ', '.join(f'<#{channel_id}>' for channel_id in sorted(settings.monitored_channels)) or 'None configured'
+
+async def dm_fallback(member, embed):
+    """Ping a mod in the shift log channel when their DMs are closed"""
+    channel = resolver.log_channel(member.guild)
+    if channel:
+        await channel.send(content=f'{member.mention} (your DMs are closed)', embed=embed)
+
+reminders = DeadlineScheduler(check_in_reminder, per_guild=store.per_guild)
+reminder_task = None
+
+# Split reminders between replicas, see leases.py. Unset for a single instance.
+LEASE_BACKEND = os.getenv('LEASE_BACKEND')
+if LEASE_BACKEND == 'sqlite':
+    leases = LeaseManager(SQLiteLeases(os.getenv('LEASE_PATH', 'leases.db')),
+                          partitions=int(os.getenv('LEASE_PARTITIONS', '16')),
+                          ttl=float(os.getenv('LEASE_TTL', '30')),
+                          on_acquired=rebuild_reminders)
+elif LEASE_BACKEND:
+    raise ValueError(f"Unknown LEASE_BACKEND: {LEASE_BACKEND!r} (expected 'sqlite')")
+else:
+    leases = None
+lease_task = None
+notifier = DMDispatcher(dm_fallback, workers=int(os.getenv('DM_WORKERS', '4')))
+
+# --- Metrics ---
+def cached_members():
+    return sum(len(guild.members) for guild in bot.guilds)
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+# Served on /metrics by the healthcheck web server, see metrics.py
+metrics = Registry()
+LOOP_LAG = metrics.gauge('modbot_event_loop_lag_seconds', 'Most recent event loop wake-up delay')
+LOOP_LAG_HIST = metrics.histogram('modbot_event_loop_lag_distribution_seconds', 'Event loop wake-up delay')
+MESSAGES = metrics.counter('modbot_messages_total', 'Messages seen by on_message', ['monitored'])
+STORE_LATENCY = metrics.histogram('modbot_store_seconds', 'Persistence operation latency', ['op'])
+REMINDER_SECONDS = metrics.histogram('modbot_reminder_seconds', 'Time spent handling one check-in deadline', ['kind'])
+REMINDERS_FIRED = metrics.counter('modbot_reminders_fired_total', 'Check-in deadlines handled (mods scanned)', ['kind'])
+DM_LATENCY = metrics.histogram('modbot_dm_send_seconds', 'DM send latency', ['outcome'])
+DM_FAILURES = metrics.counter('modbot_dm_failures_total', 'DMs that could not be delivered', ['reason'])
+COMMAND_LATENCY = metrics.histogram('modbot_command_seconds', 'Command latency', ['command'])
+COMMAND_ERRORS = metrics.counter('modbot_command_errors_total', 'Command errors', ['command'])
+metrics.gauge('modbot_reminders_pending', 'Mods with a pending check-in deadline', callback=lambda: len(reminders))
+metrics.gauge('modbot_dm_queue_depth', 'DMs waiting to be sent', callback=lambda: notifier.queue.qsize())
+metrics.gauge('modbot_store_users', 'Users held in the in-memory store',
+              callback=lambda: len(getattr(store, 'data', ())))
+metrics.gauge('modbot_activity_users', 'Users with an activity ring', callback=lambda: len(activity.rings))
+metrics.gauge('modbot_rollup_users', 'Users with daily rollup counters, once per guild', callback=lambda: len(rollups.counts))
+metrics.gauge('modbot_cached_members', 'Members held in the discord.py member cache',
+              callback=lambda: cached_members())
+metrics.gauge('modbot_lease_partitions_held', 'Reminder partitions this replica holds',
+              callback=lambda: len(leases.held) if leases is not None else 1)
+
+def observe_dm(outcome, seconds):
+    DM_LATENCY.observe(seconds, outcome=outcome)
+    slow_calls.record('dm_send', seconds)
+    if outcome != 'sent':
+        DM_FAILURES.inc(reason=outcome)
+
+def observe_store(op, seconds):
+    STORE_LATENCY.observe(seconds, op=op)
+    slow_calls.record(f'store.{op}', seconds)
+
+store.observer = observe_store
+notifier.observer = observe_dm
+loop_lag_task = None
 
 # --- Bot Events ---
 @bot.event
+@slow_calls.timed()
 async def on_ready():
-    print(f'Mod bot logged in as {bot.user.name}')
-    print(f'Bot is in {len(bot.guilds)} guild(s)')
+    mark_startup('ready')
+    log.info('ready', bot=bot.user.name, guilds=len(bot.guilds), cluster=CLUSTER_ID)
     for guild in bot.guilds:
-        print(f'- {guild.name} (ID: {guild.id})')
+        log.info('guild_available', guild=guild.name, guild_id=guild.id)
         # Create role and channel if they don't exist
         await create_role_and_channel(guild)
     
-    # Start the web server for healthcheck
-    try:
-        await start_web_server()
-        print("✅ Web server started successfully")
-    except Exception as e:
-        print(f"❌ Error starting web server: {e}")
+    # Start the web server for healthcheck (cluster 0 only, the others share the host)
+    if CLUSTER_ID == 0:
+        try:
+            await start_web_server()
+        except Exception:
+            log.exception('web_server_failed')
+    
+    # Start cluster IPC
+    global ipc_started
+    if CLUSTER_COUNT > 1 and not ipc_started:
+        try:
+            await ipc.start()
+            ipc_started = True
+        except Exception:
+            log.exception('cluster_ipc_failed')
+    
+    global guild_config_task
+    if guild_config_task is None:
+        guild_config_task = asyncio.create_task(guild_configs.watch(on_change=apply_changed_config))
+    
+    global loop_lag_task
+    if loop_lag_task is None:
+        loop_lag_task = asyncio.create_task(monitor_loop_lag(LOOP_LAG, LOOP_LAG_HIST))
+    
+    # Start the write-behind persistence loop
+    global store_task
+    if store_task is None:
+        activity.load(await store.load_activity(get_now().timestamp() - 3600))
+        await rollups.rebuild(store)
+        store_task = asyncio.create_task(store.run())
+        log.info('persistence_started', backend=STORE_BACKEND)
     
     # Start the reminder task
-    try:
-        check_in_reminder.start()
-        print("✅ Check-in reminder system started!")
-    except Exception as e:
-        print(f"❌ Error starting reminder task: {e}")
+    global reminder_task, lease_task
+    if reminder_task is None:
+        try:
+            notifier.start()
+            if leases is not None:
+                # Take our share of partitions first so the first deadlines know their owner
+                await leases.renew()
+                lease_task = asyncio.create_task(leases.run())
+            if resolver.lean:
+                # Reminders look mods up by id, so fetch them before arming any
+                await load_mod_members()
+            await rebuild_reminders()
+            reminder_task = asyncio.create_task(reminders.run())
+            log.info('reminders_started')
+            mark_startup('reminders_armed')
+            log.info('startup_timing', **startup_timings, store=store.load_timings, member_cache=MEMBER_CACHE,
+                     cached_members=cached_members(), peak_rss_mb=peak_rss_mb())
+        except Exception:
+            log.exception('reminders_failed')
+
+@slow_calls.timed()
+async def load_mod_members():
+    """Lean member cache: fetch everyone with a recorded shift and keep the mods among them"""
+    for guild in bot.guilds:
+        try:
+            counts = await store.event_counts(guild.id, ('shifts',))
+            user_ids = [user_id for user_id, row in counts.items() if row['shifts']]
+            found = await resolver.load_mods(guild, user_ids)
+            for member in resolver.mods(guild):
+                member_names.add(member)
+            log.info('mods_loaded', guild_id=guild.id, candidates=len(user_ids), fetched=found,
+                     mods=len(resolver.mod_ids(guild)))
+        except Exception:
+            log.exception('mods_load_failed', guild_id=guild.id)
+    mark_startup('mods_loaded')
 
 async def create_role_and_channel(guild):
     try:
         # Create mod role if it doesn't exist
-        role = discord.utils.get(guild.roles, name=MOD_ROLE_NAME)
+        settings = guild_configs.get(guild.id)
+        role = discord.utils.get(guild.roles, name=settings.role_name)
         if not role:
-            role = await guild.create_role(name=MOD_ROLE_NAME)
-            print(f'Created role: {MOD_ROLE_NAME}')
+            role = await guild.create_role(name=settings.role_name)
+            log.info('role_created', guild_id=guild.id, role=settings.role_name)
         
         # Create shift log channel if it doesn't exist
-        channel = discord.utils.get(guild.text_channels, name=SHIFT_LOG_CHANNEL_NAME)
+        channel = discord.utils.get(guild.text_channels, name=settings.log_channel_name)
         if not channel:
             overwrites = {
                 guild.default_role: discord.PermissionOverwrite(read_messages=False),
                 role: discord.PermissionOverwrite(read_messages=True, send_messages=True),
                 guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
             }
-            await guild.create_text_channel(SHIFT_LOG_CHANNEL_NAME, overwrites=overwrites)
-            print(f'Created channel: {SHIFT_LOG_CHANNEL_NAME}')
-    except Exception as e:
-        print(f'Error creating role/channel: {e}')
+            await guild.create_text_channel(settings.log_channel_name, overwrites=overwrites)
+            log.info('channel_created', guild_id=guild.id, channel=settings.log_channel_name)
+    except Exception:
+        log.exception('role_channel_setup_failed', guild_id=guild.id)
+    resolver.refresh(guild)
+    member_names.build(guild)
+
+# --- Cache Invalidation ---
+@bot.event
+@slow_calls.timed()
+async def on_guild_join(guild):
+    await create_role_and_channel(guild)
+
+@bot.event
+@slow_calls.timed()
+async def on_guild_remove(guild):
+    resolver.forget(guild.id)
+    member_names.forget(guild.id)
+    mod_summary_cache.pop(guild.id, None)
+
+@bot.event
+@slow_calls.timed()
+async def on_guild_role_create(role):
+    resolver.on_role_change(role)
+
+@bot.event
+@slow_calls.timed()
+async def on_guild_role_update(before, after):
+    resolver.on_role_change(before, after)
+
+@bot.event
+@slow_calls.timed()
+async def on_guild_role_delete(role):
+    resolver.on_role_change(role)
+
+@bot.event
+@slow_calls.timed()
+async def on_guild_channel_create(channel):
+    resolver.on_channel_change(channel)
+
+@bot.event
+@slow_calls.timed()
+async def on_guild_channel_update(before, after):
+    resolver.on_channel_change(before, after)
+
+@bot.event
+@slow_calls.timed()
+async def on_guild_channel_delete(channel):
+    resolver.on_channel_change(channel)
+
+@bot.event
+@slow_calls.timed()
+async def on_member_join(member):
+    member_names.add(member)
+
+@bot.event
+@slow_calls.timed()
+async def on_member_update(before, after):
+    resolver.on_member_update(before, after)
+    if before.name != after.name or before.display_name != after.display_name:
+        member_names.update(after)
+
+@bot.event
+@slow_calls.timed()
+async def on_member_remove(member):
+    resolver.on_member_remove(member)
+    member_names.remove(member)
 
 # --- Message Monitoring ---
 @bot.event
+@slow_calls.timed()
 async def on_message(message):
-    print(f"Received message: {message.content} from {message.author.name} in {message.channel.name}")
+    log.debug('message_received', author_id=message.author.id, channel_id=message.channel.id,
+              bot=message.author.bot, content=message.content)
     
     if message.author.bot:
-        print("Message is from bot, processing commands...")
         await bot.process_commands(message)
         return
     
     # Track messages in monitored channels
-    if message.channel.id in MONITORED_CHANNEL_IDS:
-        user_id = str(message.author.id)
-        user_data = data.setdefault(user_id, {'shifts': [], 'missed': [], 'checkins': [], 'recent_messages': []})
-        
-        # Add message to recent messages
-        message_data = {
-            'channel_id': message.channel.id,
-            'content': message.content,
-            'timestamp': get_now().isoformat()
-        }
-        user_data['recent_messages'].append(message_data)
-        
-        # Keep only last 100 messages per user
-        if len(user_data['recent_messages']) > 100:
-            user_data['recent_messages'] = user_data['recent_messages'][-100:]
-        
-        save_data(data)
+    monitored = message.guild is not None and guild_configs.is_monitored(message.guild.id, message.channel.id)
+    MESSAGES.inc(monitored='yes' if monitored else 'no')
+    if monitored:
+        now = get_now().timestamp()
+        activity.record(message.author.id, message.channel.id, now)
+        await store.add_activity(message.guild.id, message.author.id, message.channel.id, now)
     
-    print("Processing commands...")
     await bot.process_commands(message)
 
 # --- Commands ---
+def ctx_settings(ctx):
+    return guild_configs.get(ctx.guild.id if ctx.guild else None)
+
 @bot.command(name='shift_start', help='Start your mod shift')
 async def shift_start(ctx):
     user = ctx.author
     guild = ctx.guild
-    role = discord.utils.get(guild.roles, name=MOD_ROLE_NAME)
-    if role not in user.roles:
-        await ctx.send('❌ You are not a mod! You need the "shitty mod" role.')
+    if not resolver.is_mod(user):
+        await ctx.send(f'❌ You are not a mod! You need the "{ctx_settings(ctx).role_name}" role.')
         return
-    now = get_now().isoformat()
-    data.setdefault(str(user.id), {'shifts': [], 'missed': [], 'checkins': [], 'recent_messages': []})
-    data[str(user.id)]['shifts'].append({'start': now, 'end': None})
-    save_data(data)
+    now = get_now().timestamp()
+    await store.start_shift(guild.id, user.id, now)
+    rollups.add(guild.id, user.id, 'shifts', now)
+    arm_reminder(user.id, guild.id, now)
     formatted_time = format_time(now)
-    await ctx.send(f'✅ **Shift Started!**\n🕐 {formatted_time}\n\n⚠️ **Remember:** You must send messages in the monitored channels and check-in every 25 minutes!\n⏰ **Grace Period:** You have 5 minutes after each 25-minute mark to check-in.\n❌ **Warning:** Missing more than 2 check-ins in a day will result in a warning.')
-    channel = discord.utils.get(guild.text_channels, name=SHIFT_LOG_CHANNEL_NAME)
+    settings = ctx_settings(ctx)
+    await ctx.send(f'✅ **Shift Started!**\n🕐 {formatted_time}\n\n⚠️ **Remember:** You must send messages in the monitored channels and check-in every {settings.checkin_minutes} minutes!\n⏰ **Grace Period:** You have {settings.grace_minutes} minutes after each {settings.checkin_minutes}-minute mark to check-in.\n❌ **Warning:** Missing more than {settings.miss_limit} check-ins in a day will result in a warning.')
+    channel = resolver.log_channel(guild)
     if channel:
         await channel.send(f'🔵 **{user.display_name}** started their shift at {formatted_time}')
 
@@ -296,72 +763,68 @@ async def shift_start(ctx):
 async def shift_end(ctx):
     user = ctx.author
     guild = ctx.guild
-    role = discord.utils.get(guild.roles, name=MOD_ROLE_NAME)
-    if role not in user.roles:
-        await ctx.send('❌ You are not a mod! You need the "shitty mod" role.')
+    if not resolver.is_mod(user):
+        await ctx.send(f'❌ You are not a mod! You need the "{ctx_settings(ctx).role_name}" role.')
         return
     
     # Check missed check-ins before ending shift
-    missed_today = get_todays_missed_checkins(user.id)
+    missed_today = get_todays_missed_checkins(guild.id, user.id)
     
-    now = get_now().isoformat()
-    user_data = data.setdefault(str(user.id), {'shifts': [], 'missed': [], 'checkins': [], 'recent_messages': []})
-    # Find last open shift
-    for shift in reversed(user_data['shifts']):
-        if shift['end'] is None:
-            shift['end'] = now
-            break
-    save_data(data)
+    now = get_now().timestamp()
+    # Closes the last open shift
+    await store.end_shift(guild.id, user.id, now)
+    reminders.cancel(user.id, guild.id)
     formatted_time = format_time(now)
     
     embed = discord.Embed(title="🔴 Shift Ended!", color=0xff0000)
     embed.add_field(name="🕐 End Time", value=formatted_time, inline=False)
     
-    if missed_today > 2:
-        embed.add_field(name="⚠️ Warning", value=f"You had {missed_today} missed check-ins today. This is above the limit of 2.", inline=False)
+    miss_limit = ctx_settings(ctx).miss_limit
+    if missed_today > miss_limit:
+        embed.add_field(name="⚠️ Warning", value=f"You had {missed_today} missed check-ins today. This is above the limit of {miss_limit}.", inline=False)
         embed.color = 0xff6b6b
     elif missed_today > 0:
         embed.add_field(name="📊 Summary", value=f"You had {missed_today} missed check-in(s) today.", inline=False)
     
     await ctx.send(embed=embed)
     
-    channel = discord.utils.get(guild.text_channels, name=SHIFT_LOG_CHANNEL_NAME)
+    channel = resolver.log_channel(guild)
     if channel:
         await channel.send(f'🔴 **{user.display_name}** ended their shift at {formatted_time}')
 
 @bot.command(name='checkin', help='Check in for your shift (must be active in monitored channels)')
 async def checkin(ctx):
     user = ctx.author
-    role = discord.utils.get(ctx.guild.roles, name=MOD_ROLE_NAME)
-    if role not in user.roles:
-        await ctx.send('❌ You are not a mod! You need the "shitty mod" role.')
+    if not resolver.is_mod(user):
+        await ctx.send(f'❌ You are not a mod! You need the "{ctx_settings(ctx).role_name}" role.')
         return
     
-    can_check, remaining_time = can_checkin(user.id)
+    can_check, remaining_time = await can_checkin(ctx.guild.id, user.id)
     if not can_check:
         minutes = int(remaining_time.total_seconds() // 60)
         seconds = int(remaining_time.total_seconds() % 60)
         await ctx.send(f'⏰ **Please wait before checking in again!**\n⏳ You can check-in again in **{minutes}m {seconds}s**')
         return
     
-    has_activity, recent_messages = check_mod_activity_in_channels(user.id, 25)
+    settings = ctx_settings(ctx)
+    has_activity, activity_count = check_mod_activity_in_channels(user.id, settings.checkin_minutes)
     if not has_activity:
-        await ctx.send(f'❌ **Check-in Failed!**\n\n⚠️ You must send at least one message in the monitored channels within the last 25 minutes before checking in.\n\n📝 **Please send a message in the monitored channels and try again.**')
+        await ctx.send(f'❌ **Check-in Failed!**\n\n⚠️ You must send at least one message in the monitored channels within the last {settings.checkin_minutes} minutes before checking in.\n\n📝 **Please send a message in the monitored channels and try again.**')
         return
     
-    now = get_now().isoformat()
-    user_data = data.setdefault(str(user.id), {'shifts': [], 'missed': [], 'checkins': [], 'recent_messages': []})
-    user_data['checkins'].append(now)
-    save_data(data)
+    now = get_now().timestamp()
+    await store.add_checkin(ctx.guild.id, user.id, now)
+    rollups.add(ctx.guild.id, user.id, 'checkins', now)
+    if await store.open_shift(ctx.guild.id, user.id) is not None:
+        arm_reminder(user.id, ctx.guild.id, now)
     
     formatted_time = format_time(now)
-    activity_count = len(recent_messages)
-    missed_today = get_todays_missed_checkins(user.id)
+    missed_today = get_todays_missed_checkins(ctx.guild.id, user.id)
     
     embed = discord.Embed(title="✅ Check-in Successful!", color=0x00ff00)
     embed.add_field(name="🕐 Time", value=formatted_time, inline=False)
     embed.add_field(name="📝 Recent Activity", value=f"You sent {activity_count} message(s) in monitored channels", inline=False)
-    embed.add_field(name="⏰ Next Check-in", value="Available in 25 minutes", inline=False)
+    embed.add_field(name="⏰ Next Check-in", value=f"Available in {settings.checkin_minutes} minutes", inline=False)
     embed.add_field(name="❌ Missed Today", value=f"{missed_today} missed check-in(s)", inline=False)
     
     await ctx.send(embed=embed)
@@ -369,22 +832,23 @@ async def checkin(ctx):
 @bot.command(name='my_stats', help='See your own mod stats')
 async def my_stats(ctx):
     user = ctx.author
-    user_data = data.get(str(user.id), {'shifts': [], 'missed': [], 'checkins': [], 'recent_messages': []})
-    total_shifts = len(user_data['shifts'])
-    missed = len(user_data['missed'])
-    checkins = len(user_data['checkins'])
-    missed_today = get_todays_missed_checkins(user.id)
-    recent_activity = len([msg for msg in user_data.get('recent_messages', []) 
-                          if (get_now() - datetime.fromisoformat(msg['timestamp'])) <= timedelta(minutes=25)])
+    guild_id = ctx.guild.id if ctx.guild else None
+    totals = await store.totals(guild_id, user.id)
+    total_shifts = totals['shifts']
+    missed = totals['missed']
+    checkins = totals['checkins']
+    missed_today = get_todays_missed_checkins(guild_id, user.id)
+    settings = ctx_settings(ctx)
+    _, recent_activity = check_mod_activity_in_channels(user.id, settings.checkin_minutes)
     
     embed = discord.Embed(title=f"📊 Stats for {user.display_name}", color=0x00ff00)
     embed.add_field(name="🔄 Total Shifts", value=str(total_shifts), inline=True)
     embed.add_field(name="✅ Successful Check-ins", value=str(checkins), inline=True)
     embed.add_field(name="❌ Total Missed", value=str(missed), inline=True)
-    embed.add_field(name="📝 Recent Activity (25min)", value=f"{recent_activity} messages", inline=True)
+    embed.add_field(name=f"📝 Recent Activity ({settings.checkin_minutes}min)", value=f"{recent_activity} messages", inline=True)
     embed.add_field(name="❌ Missed Today", value=f"{missed_today} missed check-in(s)", inline=True)
     
-    if missed_today >= 2:
+    if missed_today >= settings.miss_limit:
         embed.add_field(name="⚠️ Warning", value="You have reached the maximum allowed missed check-ins for today!", inline=False)
         embed.color = 0xff6b6b
     
@@ -396,67 +860,276 @@ async def admin_stats(ctx, *, username: str = None):
         await ctx.send('❌ You need administrator permissions to use this command.')
         return
     if username:
-        target_user = None
-        for member in ctx.guild.members:
-            if member.name == username or member.display_name == username:
-                target_user = member
-                break
+        target_id, candidates = member_names.lookup(ctx.guild.id, username)
+        # Members asked from Discord in lean mode, they are not cached
+        fetched = {}
+
+        def find(user_id):
+            return resolver.member(ctx.guild, user_id) or fetched.get(user_id)
+
+        if not target_id and not candidates and resolver.lean:
+            # The index only covers members the bot has seen, ask Discord for the name
+            for member in await ctx.guild.query_members(query=username, limit=5, cache=False):
+                member_names.add(member)
+                fetched[member.id] = member
+            target_id, candidates = member_names.lookup(ctx.guild.id, username)
+        if target_id and find(target_id) is None and resolver.lean:
+            # Indexed when they joined, but joins are not cached
+            for member in await ctx.guild.query_members(user_ids=[target_id], cache=False):
+                fetched[member.id] = member
+        target_user = find(target_id) if target_id else None
         if not target_user:
-            await ctx.send(f'❌ User {username} not found in this server.')
+            if candidates:
+                names = ', '.join(m.display_name for m in map(find, candidates) if m)
+                await ctx.send(f'❓ More than one user matches {username}: {names}')
+            else:
+                await ctx.send(f'❌ User {username} not found in this server.')
             return
-        user_data = data.get(str(target_user.id), {'shifts': [], 'missed': [], 'checkins': [], 'recent_messages': []})
         embed = discord.Embed(title=f"👑 Admin Report: {target_user.display_name}", color=0xff6b6b)
         embed.set_thumbnail(url=target_user.display_avatar.url)
-        total_shifts = len(user_data['shifts'])
-        total_checkins = len(user_data['checkins'])
-        total_missed = len(user_data['missed'])
-        recent_activity = len([msg for msg in user_data.get('recent_messages', []) 
-                              if (get_now() - datetime.fromisoformat(msg['timestamp'])) <= timedelta(minutes=25)])
+        totals = await store.totals(ctx.guild.id, target_user.id)
+        total_shifts = totals['shifts']
+        total_checkins = totals['checkins']
+        total_missed = totals['missed']
+        _, recent_activity = check_mod_activity_in_channels(target_user.id, ctx_settings(ctx).checkin_minutes)
         embed.add_field(name="📈 Overall Stats", value=f"🔄 Shifts: {total_shifts}\n✅ Check-ins: {total_checkins}\n❌ Missed: {total_missed}\n📝 Recent Activity: {recent_activity} msgs", inline=False)
         await ctx.send(embed=embed)
     else:
-        # Show stats for all mods
-        embed = discord.Embed(title="👑 Admin Report: All Mods", color=0xff6b6b)
-        for member in ctx.guild.members:
-            role = discord.utils.get(ctx.guild.roles, name=MOD_ROLE_NAME)
-            if role and role in member.roles:
-                user_data = data.get(str(member.id), {'shifts': [], 'missed': [], 'checkins': [], 'recent_messages': []})
-                total_shifts = len(user_data['shifts'])
-                total_checkins = len(user_data['checkins'])
-                total_missed = len(user_data['missed'])
-                recent_activity = len([msg for msg in user_data.get('recent_messages', []) 
-                                      if (get_now() - datetime.fromisoformat(msg['timestamp'])) <= timedelta(minutes=25)])
-                embed.add_field(name=f"{member.display_name}", value=f"Shifts: {total_shifts}, Check-ins: {total_checkins}, Missed: {total_missed}, Activity: {recent_activity}", inline=False)
-        await ctx.send(embed=embed)
+        # Show stats for all mods, a page at a time
+        rows = await get_mod_summary(ctx.guild)
+        activity_minutes = ctx_settings(ctx).checkin_minutes
+        page_count = max(1, -(-len(rows) // MOD_SUMMARY_PAGE_SIZE))
+        
+        def build_page(page):
+            embed = discord.Embed(title="👑 Admin Report: All Mods", color=0xff6b6b)
+            start = page * MOD_SUMMARY_PAGE_SIZE
+            for name, user_id, totals in rows[start:start + MOD_SUMMARY_PAGE_SIZE]:
+                _, recent_activity = check_mod_activity_in_channels(user_id, activity_minutes)
+                embed.add_field(name=name, value=f"Shifts: {totals['shifts']}, Check-ins: {totals['checkins']}, Missed: {totals['missed']}, Activity: {recent_activity}", inline=False)
+            embed.set_footer(text=f"Page {page + 1}/{page_count} • {len(rows)} mod(s)")
+            return embed
+        
+        view = EmbedPaginator(ctx.author.id, page_count, build_page) if page_count > 1 else None
+        await ctx.send(embed=build_page(0), view=view)
+
+async def get_mod_summary(guild):
+    """Mods sorted by display name with their all-time totals, cached for MOD_SUMMARY_TTL seconds"""
+    now = get_now().timestamp()
+    cached = mod_summary_cache.get(guild.id)
+    if cached and cached[0] > now:
+        return cached[1]
+    rows = []
+    for member in resolver.mods(guild):
+        rows.append((member.display_name, member.id, await store.totals(guild.id, member.id)))
+    rows.sort(key=lambda row: row[0].lower())
+    mod_summary_cache[guild.id] = (now + MOD_SUMMARY_TTL, rows)
+    return rows
 
 @bot.command(name='weekly_report', help='Get weekly report for all mods (admin only)')
 async def weekly_report(ctx):
     if not ctx.author.guild_permissions.administrator:
         await ctx.send('❌ You need administrator permissions to use this command.')
         return
-    now = get_now()
-    week_ago = now - timedelta(days=7)
+    today = rollups.today()
     
     embed = discord.Embed(title="📊 Weekly Mod Report", description="Last 7 days", color=0x3498db)
     
-    for mod_id, mod_data in data.items():
-        user = ctx.guild.get_member(int(mod_id))
+    counts = rollups.summary(ctx.guild.id, ('checkins', 'missed'), today - 6, today)
+    for mod_id, mod_counts in counts.items():
+        user = resolver.member(ctx.guild, int(mod_id))
         if not user:
             continue
-        missed = [m for m in mod_data.get('missed', []) if datetime.fromisoformat(m) > week_ago]
-        checkins = [c for c in mod_data.get('checkins', []) if datetime.fromisoformat(c) > week_ago]
         
         embed.add_field(
             name=f"👤 {user.display_name}", 
-            value=f"✅ Check-ins: {len(checkins)}\n❌ Missed: {len(missed)}", 
+            value=f"✅ Check-ins: {mod_counts['checkins']}\n❌ Missed: {mod_counts['missed']}", 
             inline=True
         )
     
     await ctx.send(embed=embed)
 
+@bot.command(name='analytics', help='Hour by weekday heatmaps and shift coverage gaps (admin only, use: *analytics [days])')
+async def analytics_report(ctx, days: int = 30):
+    if not ctx.author.guild_permissions.administrator:
+        await ctx.send('❌ You need administrator permissions to use this command.')
+        return
+    if not 1 <= days <= ANALYTICS_MAX_DAYS:
+        await ctx.send(f'❌ Pick between 1 and {ANALYTICS_MAX_DAYS} days.')
+        return
+    started = time.perf_counter()
+    now = get_now().timestamp()
+    # Whole hours, ending with the current one
+    start = (int(now) // 3600 + 1) * 3600 - days * 86400
+    events = await store.events_between(ctx.guild.id, HEATMAP_KINDS, start, now)
+    shifts = await store.shift_intervals(ctx.guild.id, start, now)
+    report = await asyncio.to_thread(build_report, events, shifts, PKT, start, days, now)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    log.info('analytics_built', guild_id=ctx.guild.id, days=days, events=len(events), shifts=len(shifts),
+             backend=report['backend'], ms=round(elapsed_ms, 1))
+
+    embed = discord.Embed(title="📈 Mod Analytics",
+                          description=f"Last {days} days by weekday and hour (PKT), darker is busier", color=0x9b59b6)
+    for kind, title in (('checkins', '✅ Check-ins'), ('missed', '❌ Missed'), ('activity', '💬 Channel Activity')):
+        embed.add_field(name=f"{title} ({report['totals'][kind]:,})",
+                        value=f"```\n{render_heatmap(report[kind])}\n```", inline=False)
+    embed.add_field(name="🛡️ Mods On Shift", value=f"```\n{render_heatmap(report['coverage'])}\n```", inline=False)
+    gaps = [f"{WEEKDAYS[day]} {hour:02d}:00, {length}h, avg {mean:.1f} mods on shift"
+            for day, hour, length, mean in report['gaps']]
+    embed.add_field(name="🕳️ Coverage Gaps (under 1 mod)", value='\n'.join(gaps) or 'None', inline=False)
+    embed.set_footer(text=f"{report['mods']} mods with shifts • {len(events):,} events • "
+                          f"{elapsed_ms:.0f} ms ({report['backend']})")
+    await ctx.send(embed=embed)
+
+@bot.command(name='rebuild_rollups', help='Recompute daily stats counters from raw history (admin only)')
+async def rebuild_rollups(ctx):
+    if not ctx.author.guild_permissions.administrator:
+        await ctx.send('❌ You need administrator permissions to use this command.')
+        return
+    events = await rollups.rebuild(store)
+    await ctx.send(f'✅ Rebuilt daily counters from {events} events for {len(rollups.counts)} user(s).')
+
+@bot.command(name='retention', help='Show or set how many months of history stay in memory (admin only)')
+async def retention(ctx, months: int = None):
+    if not ctx.author.guild_permissions.administrator:
+        await ctx.send('❌ You need administrator permissions to use this command.')
+        return
+    if await store.retention_status() is None:
+        await ctx.send('ℹ️ This store keeps all history on disk, there is nothing to archive.')
+        return
+    if months is not None:
+        try:
+            await store.set_retention(months)
+        except ValueError as e:
+            await ctx.send(f'❌ {e}')
+            return
+        moved = await store.archive_history()
+        # Daily counters only cover what is still hot
+        await rollups.rebuild(store)
+        await ctx.send(f'✅ Keeping {months} month(s) in memory, archived {moved} record(s).')
+
+    status = await store.retention_status()
+    cutoff = format_time(status['cutoff']) if status['cutoff'] else 'Nothing archived yet'
+    embed = discord.Embed(title="🗄️ History Retention", color=0x3498db)
+    embed.add_field(name="Months in memory", value=status['retention_months'], inline=True)
+    embed.add_field(name="Archived before", value=cutoff, inline=True)
+    embed.add_field(name="Archived months", value=len(status['archived_months']), inline=True)
+    embed.add_field(name="Records in memory", value=f"{status['hot_records']} ({status['hot_users']} users)", inline=True)
+    embed.add_field(name="Segments loaded", value=status['segments_loaded'], inline=True)
+    await ctx.send(embed=embed)
+
+CONFIG_SETTINGS = {
+    # name in *config -> (setting, parser, description)
+    'role': ('role_name', str, 'Mod role name'),
+    'log_channel': ('log_channel_name', str, 'Shift log channel name'),
+    'checkin_minutes': ('checkin_interval', lambda value: int(value) * 60, 'Minutes between check-ins'),
+    'grace_minutes': ('grace_period', lambda value: int(value) * 60, 'Grace period in minutes'),
+    'miss_limit': ('miss_limit', int, 'Missed check-ins allowed per day'),
+}
+
+async def apply_guild_config(guild, before):
+    """Bring a guild in line with changed settings: role, channel and, if their timings changed, armed deadlines"""
+    await create_role_and_channel(guild)
+    after = guild_configs.get(guild.id)
+    if (before.checkin_interval, before.grace_period) == (after.checkin_interval, after.grace_period):
+        return
+    for guild_id, user_id, start in await store.open_shifts():
+        if user_id in resolver.mod_ids(guild) and guild_id in (None, guild.id):
+            rearm_reminder(user_id, guild.id, await window_base(guild_id, user_id, start))
+
+async def apply_changed_config(guild_id, before):
+    """Follow up on an edit to the config file the way *config set does"""
+    guild = bot.get_guild(guild_id)
+    if guild is not None:
+        await apply_guild_config(guild, before)
+
+@bot.group(name='config', invoke_without_command=True, help="Show this server's mod settings (admin only)")
+async def config(ctx):
+    if not ctx.author.guild_permissions.administrator:
+        await ctx.send('❌ You need administrator permissions to use this command.')
+        return
+    settings = ctx_settings(ctx)
+    embed = discord.Embed(title="⚙️ Server Settings", color=0x3498db)
+    for name, (setting, _, description) in CONFIG_SETTINGS.items():
+        value = getattr(settings, setting)
+        if setting in ('checkin_interval', 'grace_period'):
+            value //= 60
+        embed.add_field(name=f"{description} (`{name}`)", value=str(value), inline=True)
+    embed.add_field(name="Monitored Channels (`channels`)", value=channel_mentions(settings), inline=False)
+    embed.set_footer(text="*config set <name> <value> • *config reset <name> • *config channels add/remove #channel")
+    await ctx.send(embed=embed)
+
+@config.command(name='set', help='Change a setting, e.g. *config set checkin_minutes 30')
+async def config_set(ctx, name: str, *, value: str):
+    if not ctx.author.guild_permissions.administrator:
+        await ctx.send('❌ You need administrator permissions to use this command.')
+        return
+    if name not in CONFIG_SETTINGS:
+        await ctx.send(f'❌ Unknown setting {name}. Use one of: {", ".join(CONFIG_SETTINGS)}')
+        return
+    setting, parse, description = CONFIG_SETTINGS[name]
+    try:
+        parsed = parse(value.strip())
+    except ValueError:
+        await ctx.send(f'❌ {value} is not a valid value for {name}.')
+        return
+    if isinstance(parsed, int) and (parsed < 0 or parsed == 0 and setting != 'miss_limit'):
+        await ctx.send(f'❌ {name} must be more than 0.')
+        return
+    before = ctx_settings(ctx)
+    await guild_configs.update(ctx.guild.id, **{setting: parsed})
+    await apply_guild_config(ctx.guild, before)
+    await ctx.send(f'✅ {description} set to {value.strip()}.')
+
+@config.command(name='reset', help='Put a setting back to the default')
+async def config_reset(ctx, name: str):
+    if not ctx.author.guild_permissions.administrator:
+        await ctx.send('❌ You need administrator permissions to use this command.')
+        return
+    setting = 'monitored_channels' if name == 'channels' else CONFIG_SETTINGS.get(name, (None,))[0]
+    if setting is None:
+        await ctx.send(f'❌ Unknown setting {name}.')
+        return
+    before = ctx_settings(ctx)
+    await guild_configs.update(ctx.guild.id, **{setting: None})
+    await apply_guild_config(ctx.guild, before)
+    await ctx.send(f'✅ {name} is back to the default.')
+
+@config.command(name='channels', help='Add or remove monitored channels, e.g. *config channels add #general')
+async def config_channels(ctx, action: str, channels: commands.Greedy[discord.TextChannel]):
+    if not ctx.author.guild_permissions.administrator:
+        await ctx.send('❌ You need administrator permissions to use this command.')
+        return
+    if action not in ('add', 'remove') or not channels:
+        await ctx.send('❌ Use *config channels add #channel or *config channels remove #channel')
+        return
+    current = set(ctx_settings(ctx).monitored_channels)
+    ids = {channel.id for channel in channels}
+    current = current | ids if action == 'add' else current - ids
+    settings = await guild_configs.update(ctx.guild.id, monitored_channels=current)
+    await ctx.send(f'✅ Monitored channels: {channel_mentions(settings)}')
+
+@bot.command(name='cluster_report', help='Totals across every bot process (admin only)')
+async def cluster_report_command(ctx):
+    if not ctx.author.guild_permissions.administrator:
+        await ctx.send('❌ You need administrator permissions to use this command.')
+        return
+    reports = await ipc.gather('report')
+    embed = discord.Embed(title="🛰️ Cluster Report", description="Last 7 days, all processes", color=0x3498db)
+    for cluster_id, report in reports.items():
+        if 'error' in report:
+            embed.add_field(name=f"Cluster {cluster_id}", value=f"❌ Unreachable: {report['error']}", inline=False)
+            continue
+        embed.add_field(
+            name=f"Cluster {cluster_id}",
+            value=f"🏠 Guilds: {report['guilds']}\n👥 Mods: {report['mods']} ({report['on_shift']} on shift)\n✅ Check-ins: {report['checkins_7d']}\n❌ Missed: {report['missed_7d']}",
+            inline=True
+        )
+    await ctx.send(embed=embed)
+
 @bot.command(name='help_mod', help='Show all mod commands')
 async def help_mod(ctx):
-    help_text = """
+    settings = ctx_settings(ctx)
+    help_text = f"""
 **🤖 Mod Bot Commands:**
 
 **📋 Basic Commands:**
@@ -468,33 +1141,36 @@ async def help_mod(ctx):
 **👑 Admin Commands:**
 `*weekly_report` - Get weekly report for all mods
 `*admin_stats` - Get detailed stats for any user (use: *admin_stats <username>)
+`*analytics [days]` - Heatmaps of check-ins, misses, activity and shift coverage
+`*rebuild_rollups` - Recompute daily stats counters from raw history
+`*retention [months]` - Show or set how much history stays in memory
+`*config` - Show or change this server's mod settings
+`*profile [seconds]` - Profile the bot and attach the slowest functions
+`*cluster_report` - Totals across every bot process
 
 **🔧 Utility:**
 `*help_mod` - Show this help message
 `*ping` - Test if bot is working
 
 **⚠️ Check-in Rules:**
-• Must send messages in monitored channels within 25 minutes
-• Can only check-in once every 25 minutes
-• You have a 5-minute grace period after each 25-minute mark
-• Missing more than 2 check-ins in a day will result in a warning
+• Must send messages in monitored channels within {settings.checkin_minutes} minutes
+• Can only check-in once every {settings.checkin_minutes} minutes
+• You have a {settings.grace_minutes}-minute grace period after each {settings.checkin_minutes}-minute mark
+• Missing more than {settings.miss_limit} check-ins in a day will result in a warning
 • Bot tracks your activity automatically
     """
     await ctx.send(help_text)
 
 @bot.command(name='ping', help='Test if bot is working')
 async def ping(ctx):
-    print(f"Ping command received from {ctx.author.name}")
     await ctx.send('🏓 Pong! Mod bot is working!')
 
 @bot.command(name='test', help='Simple test command')
 async def test(ctx):
-    print(f"Test command received from {ctx.author.name}")
     await ctx.send('✅ Bot is responding to commands!')
 
 @bot.command(name='debug', help='Debug command to check bot status')
 async def debug(ctx):
-    print(f"Debug command received from {ctx.author.name}")
     embed = discord.Embed(title="🔧 Bot Debug Info", color=0x00ff00)
     embed.add_field(name="Bot Name", value=bot.user.name, inline=True)
     embed.add_field(name="Bot ID", value=bot.user.id, inline=True)
@@ -502,11 +1178,52 @@ async def debug(ctx):
     embed.add_field(name="Channel", value=ctx.channel.name, inline=True)
     embed.add_field(name="User", value=ctx.author.name, inline=True)
     embed.add_field(name="Message Content", value=ctx.message.content, inline=True)
+    recent = [f"<t:{int(when)}:R> `{name}` {seconds * 1000:.0f} ms"
+              for when, name, seconds in reversed(slow_calls.recent)][:8]
+    embed.add_field(name=f"🐢 Slow Calls (≥ {slow_calls.threshold * 1000:.0f} ms)",
+                    value='\n'.join(recent) or 'None', inline=False)
+    worst = [f"`{name}` {calls}× avg {mean * 1000:.0f} ms, max {peak * 1000:.0f} ms"
+             for name, calls, mean, peak in slow_calls.slowest(8)]
+    embed.add_field(name="⏱️ Slowest Handlers", value='\n'.join(worst) or 'None', inline=False)
     await ctx.send(embed=embed)
 
+@bot.command(name='profile', help='Profile the bot for a few seconds and attach the top functions (admin only, use: *profile [seconds])')
+async def profile(ctx, seconds: int = 10):
+    if not ctx.author.guild_permissions.administrator:
+        await ctx.send('❌ You need administrator permissions to use this command.')
+        return
+    if not 1 <= seconds <= PROFILE_MAX_SECONDS:
+        await ctx.send(f'❌ Profile for between 1 and {PROFILE_MAX_SECONDS} seconds.')
+        return
+    if profile_busy():
+        await ctx.send('⏳ A profile is already running, try again when it is done.')
+        return
+    await ctx.send(f'⏱️ Profiling for {seconds} seconds...')
+    report = await capture_profile(seconds)
+    log.info('profile_captured', seconds=seconds, user_id=ctx.author.id)
+    filename = f"profile-{get_now().strftime('%Y%m%d-%H%M%S')}.txt"
+    await ctx.send(f'📄 Top functions by cumulative time over {seconds} seconds',
+                   file=discord.File(io.BytesIO(report.encode()), filename=filename))
+
+# --- Command Instrumentation ---
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.command_started = asyncio.get_running_loop().time()
+
+@bot.after_invoke
+async def record_command_time(ctx):
+    started = getattr(ctx, 'command_started', None)
+    if started is not None:
+        seconds = asyncio.get_running_loop().time() - started
+        COMMAND_LATENCY.observe(seconds, command=ctx.command.qualified_name)
+        if ctx.command.name != 'profile':  # Slow on purpose
+            slow_calls.record(f'*{ctx.command.qualified_name}', seconds)
+
 @bot.event
 async def on_command_error(ctx, error):
-    print(f"Command error: {error}")
+    log.warning('command_error', command=ctx.command.qualified_name if ctx.command else None,
+                user_id=ctx.author.id, error=str(error))
+    COMMAND_ERRORS.inc(command=ctx.command.qualified_name if ctx.command else 'unknown')
     if isinstance(error, commands.CommandNotFound):
         await ctx.send(f"❌ Command not found. Use `*help_mod` to see available commands.")
     else:
@@ -514,7 +1231,14 @@ async def on_command_error(ctx, error):
 
 @bot.event
 async def on_error(event, *args, **kwargs):
-    print(f"Bot error in event {event}: {args} {kwargs}")
+    log.exception('event_error', handler=event)
 
 if __name__ == '__main__':
-    bot.run(TOKEN) 
\ No newline at end of file
+    try:
+        # Our root handler already routes discord.py's logs
+        bot.run(TOKEN, log_handler=None)
+    finally:
+        # Flush the journal and write a final snapshot
+        store.close()
+        if leases is not None:
+            leases.close() 
\ No newline at end of file
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+from logs import get_logger, setup_logging
+
+log = get_logger(__name__)
+
+# --- Multi-process sharding ---
+# `python cluster.py` starts CLUSTER_COUNT copies of bot.py. Each one owns a
+# contiguous block of the SHARD_COUNT gateway shards, keeps the mod data for
+# its guilds in its own partition (mod_data.<cluster>.json / .db) and serves
+# a small IPC endpoint on localhost so reports can be aggregated across
+# processes. Cluster 0 also serves the public healthcheck on port 8080.
+#
+# Guilds map to shards by (guild_id >> 22) % SHARD_COUNT, so changing
+# SHARD_COUNT or CLUSTER_COUNT moves guilds between partitions.
+
+IPC_HOST = '127.0.0.1'
+
+def shard_ids_for(cluster_id, cluster_count, shard_count):
+    per_cluster, extra = divmod(shard_count, cluster_count)
+    start = cluster_id * per_cluster + min(cluster_id, extra)
+    end = start + per_cluster + (1 if cluster_id < extra else 0)
+    return list(range(start, end))
+
+def cluster_for_guild(guild_id, cluster_count, shard_count):
+    """Cluster whose shards receive the guild's events"""
+    shard_id = (guild_id >> 22) % shard_count
+    for cluster_id in range(cluster_count):
+        if shard_id in shard_ids_for(cluster_id, cluster_count, shard_count):
+            return cluster_id
+    raise ValueError(f"No cluster runs shard {shard_id}")
+
+class ClusterIPC:
+    """Local request/response channel between cluster processes.
+
+    Handlers are coroutines taking string keyword arguments and returning
+    JSON-serializable values. ``call`` runs a handler on one cluster (the
+    local one directly), ``gather`` on every cluster and returns
+    {cluster_id: result}; unreachable clusters map to {'error': ...}.
+    """
+
+    def __init__(self, cluster_id, cluster_count, base_port, secret, timeout=5):
+        self.cluster_id = cluster_id
+        self.cluster_count = cluster_count
+        self.base_port = base_port
+        self.secret = secret
+        self.timeout = timeout
+        self.handlers = {}
+        self._runner = None
+        self._session = None
+
+    def handler(self, name):
+        def decorator(coro):
+            self.handlers[name] = coro
+            return coro
+        return decorator
+
+    async def _handle(self, request):
+        if request.headers.get('Authorization') != self.secret:
+            return web.json_response({'error': 'unauthorized'}, status=401)
+        handler = self.handlers.get(request.match_info['name'])
+        if handler is None:
+            return web.json_response({'error': 'unknown handler'}, status=404)
+        return web.json_response(await handler(**request.query))
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/ipc/{name}', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, IPC_HOST, self.base_port + self.cluster_id)
+        await site.start()
+        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        log.info('cluster_ipc_started', cluster=self.cluster_id, port=self.base_port + self.cluster_id)
+
+    async def call(self, cluster_id, name, **params):
+        if cluster_id == self.cluster_id:
+            return await self.handlers[name](**params)
+        if self._session is None:
+            return {'error': 'IPC not started'}
+        url = f'http://{IPC_HOST}:{self.base_port + cluster_id}/ipc/{name}'
+        try:
+            async with self._session.get(url, params=params, headers={'Authorization': self.secret}) as response:
+                return await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return {'error': str(e) or type(e).__name__}
+
+    async def gather(self, name):
+        results = await asyncio.gather(*(self.call(i, name) for i in range(self.cluster_count)))
+        return dict(enumerate(results))
+
+# --- Launcher ---
+def launch():
+    cluster_count = int(os.getenv('CLUSTER_COUNT', '2'))
+    shard_count = int(os.getenv('SHARD_COUNT', str(cluster_count)))
+    if shard_count < cluster_count:
+        sys.exit(f"❌ SHARD_COUNT ({shard_count}) must be at least CLUSTER_COUNT ({cluster_count})")
+    secret = os.getenv('IPC_SECRET') or secrets.token_hex(16)
+    bot_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot.py')
+
+    def spawn(cluster_id):
+        shard_ids = shard_ids_for(cluster_id, cluster_count, shard_count)
+        env = dict(os.environ,
+                   CLUSTER_ID=str(cluster_id),
+                   CLUSTER_COUNT=str(cluster_count),
+                   SHARD_COUNT=str(shard_count),
+                   SHARD_IDS=','.join(map(str, shard_ids)),
+                   IPC_SECRET=secret)
+        log.info('cluster_starting', cluster=cluster_id, shards=shard_ids)
+        return subprocess.Popen([sys.executable, bot_path], env=env)
+
+    children = {cluster_id: spawn(cluster_id) for cluster_id in range(cluster_count)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for child in children.values():
+            if child.poll() is None:
+                # SIGINT lets bot.py flush its store on the way out
+                child.send_signal(signal.SIGINT)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while not stopping:
+        time.sleep(1)
+        for cluster_id, child in list(children.items()):
+            code = child.poll()
+            if code is not None and not stopping:
+                log.error('cluster_exited', cluster=cluster_id, code=code, restart_in=5)
+                time.sleep(5)
+                children[cluster_id] = spawn(cluster_id)
+    for child in children.values():
+        child.wait()
+
+if __name__ == '__main__':
+    setup_logging()
+    launch()
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import os
+
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# --- Per-guild configuration ---
+# Every guild can override the mod role, shift log channel, monitored
+# channels and check-in rules. Overrides live in guild_config.json as
+# {guild_id: {setting: value}}; anything unset falls back to the defaults.
+# Settings are immutable objects swapped out on change, and monitored
+# channels are frozensets keyed by guild id, so the per-message check is two
+# hash lookups. Changes made by admin commands are saved right away. Edits to
+# the file itself (or by another process) are picked up by watch(), which
+# hands each changed guild to the same follow-up the admin commands run.
+
+class GuildSettings:
+    __slots__ = ('role_name', 'log_channel_name', 'monitored_channels',
+                 'checkin_interval', 'grace_period', 'miss_limit')
+
+    # Setting -> parser for values read from the file or an admin command
+    FIELDS = {
+        'role_name': str,
+        'log_channel_name': str,
+        'monitored_channels': lambda ids: frozenset(int(i) for i in ids),
+        'checkin_interval': int,
+        'grace_period': int,
+        'miss_limit': int,
+    }
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, self.FIELDS[name](values[name]))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('GuildSettings is immutable, use GuildConfigs.update()')
+
+    def replace(self, **changes):
+        return GuildSettings(**dict(self.as_dict(), **changes))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @property
+    def checkin_minutes(self):
+        return self.checkin_interval // 60
+
+    @property
+    def grace_minutes(self):
+        return self.grace_period // 60
+
+class GuildConfigs:
+    def __init__(self, path, defaults):
+        self.path = path
+        self.defaults = defaults
+        self.settings = {}
+        self.monitored = {}
+        self._overrides = {}
+        self._mtime = None
+        self.listeners = []
+
+    def get(self, guild_id):
+        """Settings for a guild; the defaults for None or an unconfigured guild"""
+        return self.settings.get(guild_id, self.defaults)
+
+    def is_monitored(self, guild_id, channel_id):
+        return channel_id in self.monitored.get(guild_id, self.defaults.monitored_channels)
+
+    # --- Loading ---
+    def _read(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, 'r') as f:
+                return mtime, json.load(f)
+        except FileNotFoundError:
+            return None, {}
+
+    def _apply(self, overrides):
+        """Rebuild settings from {guild_id: {setting: value}}, returns ids of guilds that changed"""
+        settings = {}
+        for guild_id, values in overrides.items():
+            known = {name: value for name, value in values.items() if name in GuildSettings.FIELDS}
+            settings[int(guild_id)] = self.defaults.replace(**known)
+        changed = {guild_id for guild_id in set(settings) | set(self.settings)
+                   if self.get(guild_id).as_dict() != settings.get(guild_id, self.defaults).as_dict()}
+        self.settings = settings
+        self.monitored = {guild_id: s.monitored_channels for guild_id, s in settings.items()}
+        self._overrides = overrides
+        return changed
+
+    def load(self):
+        self._mtime, overrides = self._read()
+        self._apply(overrides)
+        return self
+
+    def _notify(self, changed):
+        for guild_id in changed:
+            for listener in self.listeners:
+                listener(guild_id)
+
+    # --- Changes ---
+    def _write(self, overrides):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(overrides, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        return os.path.getmtime(self.path)
+
+    async def update(self, guild_id, **changes):
+        """Set (or with None, reset to default) settings for a guild and save them"""
+        for name in changes:
+            if name not in GuildSettings.FIELDS:
+                raise ValueError(f"Unknown setting: {name}")
+        # Start from the file so changes saved by another process are kept
+        _, overrides = await asyncio.to_thread(self._read)
+        values = dict(overrides.get(str(guild_id), {}))
+        for name, value in changes.items():
+            if value is None:
+                values.pop(name, None)
+            else:
+                parsed = GuildSettings.FIELDS[name](value)
+                values[name] = sorted(parsed) if isinstance(parsed, frozenset) else parsed
+        if values:
+            overrides[str(guild_id)] = values
+        else:
+            overrides.pop(str(guild_id), None)
+        self._mtime = await asyncio.to_thread(self._write, overrides)
+        self._notify(self._apply(overrides))
+        log.info('guild_config_updated', guild_id=guild_id, changes=changes)
+        return self.get(guild_id)
+
+    async def watch(self, interval=5.0, on_change=None):
+        """Reload the file when it changes on disk, then await on_change(guild_id, previous settings)
+        for every changed guild"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime = await asyncio.to_thread(lambda: os.path.getmtime(self.path) if os.path.exists(self.path) else None)
+                if mtime == self._mtime:
+                    continue
+                self._mtime, overrides = await asyncio.to_thread(self._read)
+                before = {guild_id: self.get(guild_id) for guild_id in self.settings}
+                changed = self._apply(overrides)
+                self._notify(changed)
+                log.info('guild_config_reloaded', guilds=len(self.settings), changed=sorted(changed))
+            except Exception:
+                log.exception('guild_config_reload_failed')
+                continue
+            if on_change is None:
+                continue
+            for guild_id in sorted(changed):
+                try:
+                    await on_change(guild_id, before.get(guild_id, self.defaults))
+                except Exception:
+                    log.exception('guild_config_apply_failed', guild_id=guild_id)
@@ -0,0 +1,192 @@
+import asyncio
+import math
+import os
+import secrets
+import socket
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# --- Reminder leases ---
+# When several replicas run at once (a rolling deploy, or on purpose), mods
+# are split between them by a hash of the user id into a fixed number of
+# partitions. A replica only sends reminders and records misses for users
+# in partitions it holds a lease on. Leases expire unless renewed, so a
+# replica that dies loses its partitions within one TTL and the others pick
+# them up. Live replicas each take a fair share of the partitions.
+#
+# Every grant of a partition gets a new, higher token. Before it acts on a
+# deadline the replica claims it with its token. The claim is rejected if
+# the token is no longer current or the deadline was already claimed, so a
+# replica that paused past its lease cannot double-send.
+
+SQLITE_LEASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    partition INTEGER PRIMARY KEY,
+    owner TEXT,
+    token INTEGER NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS replicas (
+    owner TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS claims (
+    key TEXT PRIMARY KEY,
+    token INTEGER NOT NULL,
+    claimed REAL NOT NULL
+);
+"""
+
+def partition_of(user_id, partitions):
+    return zlib.crc32(str(user_id).encode()) % partitions
+
+class SQLiteLeases:
+    """Lease table in a SQLite file shared by every replica on the host or volume"""
+
+    def __init__(self, path, claim_ttl=86400):
+        self.path = path
+        self.claim_ttl = claim_ttl
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SQLITE_LEASE_SCHEMA)
+        return self._conn
+
+    def _transaction(self, func, *args):
+        conn = self._connect()
+        # IMMEDIATE takes the write lock up front so two replicas cannot grant the same partition
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(conn, *args)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return result
+
+    def renew(self, owner, partitions, ttl, now):
+        """Heartbeat, renew held leases and rebalance, returns {partition: token} held by owner"""
+        return self._transaction(self._renew, owner, partitions, ttl, now)
+
+    def _renew(self, conn, owner, partitions, ttl, now):
+        conn.execute('INSERT OR REPLACE INTO replicas VALUES (?, ?)', (owner, now + ttl))
+        conn.execute('DELETE FROM replicas WHERE expires < ?', (now,))
+        replicas = conn.execute('SELECT COUNT(*) FROM replicas').fetchone()[0]
+        share = math.ceil(partitions / replicas)
+
+        leases = {row[0]: row[1:] for row in conn.execute('SELECT partition, owner, token, expires FROM leases')}
+        held = sorted(p for p, (holder, _, expires) in leases.items() if holder == owner and expires >= now)
+        # Hand back partitions above the fair share so a new replica can take them
+        for partition in held[share:]:
+            conn.execute('UPDATE leases SET owner = NULL, expires = 0 WHERE partition = ?', (partition,))
+        held = held[:share]
+        for partition in held:
+            conn.execute('UPDATE leases SET expires = ? WHERE partition = ?', (now + ttl, partition))
+        for partition in range(partitions):
+            if len(held) >= share:
+                break
+            holder, token, expires = leases.get(partition, (None, 0, 0))
+            if holder is not None and holder != owner and expires >= now:
+                continue
+            if partition in held:
+                continue
+            conn.execute('INSERT OR REPLACE INTO leases VALUES (?, ?, ?, ?)', (partition, owner, token + 1, now + ttl))
+            held.append(partition)
+
+        conn.execute('DELETE FROM claims WHERE claimed < ?', (now - self.claim_ttl,))
+        rows = conn.execute('SELECT partition, token FROM leases WHERE owner = ?', (owner,)).fetchall()
+        return dict(rows)
+
+    def claim(self, partition, token, key, now):
+        """Record that the holder of token acts on key, False if the token is stale or key was claimed"""
+        return self._transaction(self._claim, partition, token, key, now)
+
+    def _claim(self, conn, partition, token, key, now):
+        row = conn.execute('SELECT token, expires FROM leases WHERE partition = ?', (partition,)).fetchone()
+        if row is None or row[0] != token or row[1] < now:
+            return False
+        cursor = conn.execute('INSERT OR IGNORE INTO claims VALUES (?, ?, ?)', (key, token, now))
+        return cursor.rowcount == 1
+
+    def release(self, owner):
+        def _release(conn):
+            conn.execute('UPDATE leases SET owner = NULL, expires = 0 WHERE owner = ?', (owner,))
+            conn.execute('DELETE FROM replicas WHERE owner = ?', (owner,))
+        self._transaction(_release)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+class LeaseManager:
+    """Holds this replica's reminder partitions. Backend calls run on one worker thread."""
+
+    def __init__(self, backend, partitions=16, ttl=30.0, on_acquired=None):
+        """``on_acquired(partitions)`` is awaited with newly granted partitions so their deadlines can be re-armed"""
+        self.backend = backend
+        self.partitions = partitions
+        self.ttl = ttl
+        self.on_acquired = on_acquired
+        self.owner = f'{socket.gethostname()}-{os.getpid()}-{secrets.token_hex(3)}'
+        self.held = {}
+        # Local view of the leases expires a little before the backend's does
+        self._valid_until = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='leases')
+
+    def partition(self, user_id):
+        return partition_of(user_id, self.partitions)
+
+    def owns(self, user_id):
+        return time.time() < self._valid_until and self.partition(user_id) in self.held
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def claim(self, user_id, key):
+        """Fence an action on user_id: True for exactly one current lease holder per key"""
+        partition = self.partition(user_id)
+        token = self.held.get(partition)
+        if token is None:
+            return False
+        return await self._call(self.backend.claim, partition, token, f'{user_id}:{key}', time.time())
+
+    async def renew(self):
+        now = time.time()
+        held = await self._call(self.backend.renew, self.owner, self.partitions, self.ttl, now)
+        gained = [partition for partition, token in held.items() if self.held.get(partition) != token]
+        lost = [partition for partition in self.held if partition not in held]
+        self.held = held
+        self._valid_until = now + self.ttl * 2 / 3
+        if gained or lost:
+            log.info('leases_changed', owner=self.owner, held=len(held), gained=gained, lost=lost)
+        if gained and self.on_acquired is not None:
+            await self.on_acquired(set(gained))
+
+    async def run(self):
+        """Renew every third of the TTL"""
+        while True:
+            try:
+                await self.renew()
+            except Exception:
+                log.exception('lease_renew_failed', owner=self.owner)
+            await asyncio.sleep(self.ttl / 3)
+
+    def close(self):
+        """Give the partitions back right away so another replica takes over without waiting for expiry"""
+        def _close():
+            try:
+                self.backend.release(self.owner)
+            finally:
+                self.backend.close()
+        self._executor.submit(_close).result()
+        self._executor.shutdown()
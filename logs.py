@@ -0,0 +1,110 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+# --- Structured logging ---
+# Records are handed to a background thread through a queue and written
+# there as JSON lines, so the event loop only pays for building a small
+# record. High-volume events can be sampled and message content is redacted
+# unless LOG_MESSAGE_CONTENT=1.
+#
+#   LOG_LEVEL        DEBUG / INFO / WARNING / ERROR (default INFO)
+#   LOG_SAMPLING     per-event keep rates, e.g. "message_received=0.01,dm_sent=0.1"
+#   LOG_MESSAGE_CONTENT  set to 1 to log message content instead of its length
+
+DEFAULT_SAMPLING = {'message_received': 0.01}
+REDACTED_FIELDS = ('content',)
+
+_sampling = dict(DEFAULT_SAMPLING)
+_log_content = False
+_listener = None
+
+def parse_sampling(spec):
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        event, _, rate = item.partition('=')
+        rates[event.strip()] = float(rate)
+    return rates
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread"""
+
+    def prepare(self, record):
+        return record
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': getattr(record, 'event', None) or record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class EventLogger:
+    """Logs named events with keyword fields: log.info('shift_started', user_id=...)"""
+
+    def __init__(self, name):
+        self._logger = logging.getLogger(name)
+
+    def _log(self, level, event, fields, exc_info=False):
+        if not self._logger.isEnabledFor(level):
+            return
+        rate = _sampling.get(event)
+        if rate is not None and (rate <= 0 or (rate < 1 and random.random() >= rate)):
+            return
+        if not _log_content:
+            for key in REDACTED_FIELDS:
+                value = fields.get(key)
+                if isinstance(value, str):
+                    fields[key] = f'<redacted {len(value)} chars>'
+        self._logger.log(level, event, exc_info=exc_info, extra={'event': event, 'fields': fields})
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, **fields):
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+def get_logger(name):
+    return EventLogger(name)
+
+def setup_logging(level=None, sampling=None, log_content=None, stream=None):
+    """Route every logger (discord.py's included) through the background JSON writer"""
+    global _listener, _log_content
+    if _listener is not None:
+        return
+    level = level or os.getenv('LOG_LEVEL', 'INFO')
+    _sampling.update(parse_sampling(sampling if sampling is not None else os.getenv('LOG_SAMPLING', '')))
+    if log_content is None:
+        log_content = os.getenv('LOG_MESSAGE_CONTENT', '') == '1'
+    _log_content = log_content
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    records = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=False)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.handlers[:] = [_DeferredQueueHandler(records)]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
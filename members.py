@@ -0,0 +1,126 @@
+import bisect
+import difflib
+
+import discord
+
+# --- Member name index ---
+# A sorted list of (lowercased name, member id) per guild covering both
+# usernames and display names, so admin_stats can find a member by exact
+# name, prefix or a close fuzzy match without walking guild.members.
+
+class MemberNameIndex:
+    def __init__(self):
+        self.keys = {}
+        self.names = {}
+
+    def _add(self, guild_id, member_id, name):
+        keys = self.keys.setdefault(guild_id, [])
+        key = (name.lower(), member_id)
+        i = bisect.bisect_left(keys, key)
+        if i == len(keys) or keys[i] != key:
+            keys.insert(i, key)
+
+    def _remove(self, guild_id, member_id, name):
+        keys = self.keys.get(guild_id, [])
+        key = (name.lower(), member_id)
+        i = bisect.bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+
+    def build(self, guild):
+        keys = []
+        names = {}
+        for member in guild.members:
+            member_names = {member.name, member.display_name}
+            names[member.id] = member_names
+            keys.extend((name.lower(), member.id) for name in member_names)
+        keys.sort()
+        self.keys[guild.id] = keys
+        self.names[guild.id] = names
+
+    def add(self, member):
+        member_names = {member.name, member.display_name}
+        self.names.setdefault(member.guild.id, {})[member.id] = member_names
+        for name in member_names:
+            self._add(member.guild.id, member.id, name)
+
+    def remove(self, member):
+        member_names = self.names.get(member.guild.id, {}).pop(member.id, set())
+        for name in member_names:
+            self._remove(member.guild.id, member.id, name)
+
+    def update(self, member):
+        self.remove(member)
+        self.add(member)
+
+    def forget(self, guild_id):
+        self.keys.pop(guild_id, None)
+        self.names.pop(guild_id, None)
+
+    def prefix(self, guild_id, text, limit=10):
+        """Member ids whose name or display name starts with text, case-insensitive"""
+        keys = self.keys.get(guild_id, [])
+        text = text.lower()
+        i = bisect.bisect_left(keys, (text, -1))
+        found = []
+        while i < len(keys) and keys[i][0].startswith(text) and len(found) < limit:
+            if keys[i][1] not in found:
+                found.append(keys[i][1])
+            i += 1
+        return found
+
+    def lookup(self, guild_id, text):
+        """Best match for text: exact name, then unique prefix, then closest fuzzy match.
+
+        Returns (member_id or None, [candidate member ids]).
+        """
+        keys = self.keys.get(guild_id, [])
+        lowered = text.lower()
+        i = bisect.bisect_left(keys, (lowered, -1))
+        if i < len(keys) and keys[i][0] == lowered:
+            return keys[i][1], []
+        candidates = self.prefix(guild_id, text)
+        if len(candidates) == 1:
+            return candidates[0], []
+        if candidates:
+            return None, candidates
+        names = {}
+        for name, member_id in keys:
+            names.setdefault(name, member_id)
+        close = difflib.get_close_matches(lowered, list(names), n=5, cutoff=0.75)
+        if len(close) == 1:
+            return names[close[0]], []
+        return None, [names[name] for name in close]
+
+# --- Paginated embeds ---
+class EmbedPaginator(discord.ui.View):
+    """Previous/next buttons over pages that are built on demand by page_builder(page)"""
+
+    def __init__(self, author_id, page_count, page_builder, timeout=180):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.page_count = page_count
+        self.page_builder = page_builder
+        self.page = 0
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+
+    async def interaction_check(self, interaction):
+        return interaction.user.id == self.author_id
+
+    async def _show(self, interaction):
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.page_builder(self.page), view=self)
+
+    @discord.ui.button(label='◀ Previous', style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        self.page = max(0, self.page - 1)
+        await self._show(interaction)
+
+    @discord.ui.button(label='Next ▶', style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        self.page = min(self.page_count - 1, self.page + 1)
+        await self._show(interaction)
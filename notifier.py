@@ -0,0 +1,136 @@
+import asyncio
+import random
+import time
+
+import discord
+
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# --- Outbound DM queue ---
+# Reminders and miss notices are queued here instead of being awaited inline,
+# so one slow DM or a user with closed DMs never holds up the reminder loop.
+# A pool of workers drains the queue, honours per-user retry_after windows,
+# retries transient failures with backoff and remembers who rejects DMs.
+
+class Notice:
+    __slots__ = ('member', 'kind', 'embed', 'attempts')
+
+    def __init__(self, member, kind, embed):
+        self.member = member
+        self.kind = kind
+        self.embed = embed
+        self.attempts = 0
+
+    @property
+    def key(self):
+        return (self.member.id, self.kind)
+
+class DMDispatcher:
+    def __init__(self, fallback, workers=4, maxsize=1000, max_retries=3, backoff=2.0, blocked_ttl=6 * 3600):
+        """fallback(member, embed) is awaited for users whose DMs are closed"""
+        self.fallback = fallback
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.blocked_ttl = blocked_ttl
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.pending = {}
+        self.blocked = {}
+        self.route_reset = {}
+        self.sent = 0
+        self.failed = 0
+        # Optional callable(outcome, seconds) for each delivery attempt
+        self.observer = None
+        self._tasks = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, member, kind, embed):
+        """Queue a DM without waiting, returns False if it was dropped"""
+        notice = Notice(member, kind, embed)
+        if notice.key in self.pending:
+            # Same notice already waiting for this user, send the newest version once
+            self.pending[notice.key] = notice
+            return True
+        try:
+            self.queue.put_nowait(notice.key)
+        except asyncio.QueueFull:
+            log.warning('dm_dropped', kind=kind, user_id=member.id, reason='queue_full')
+            return False
+        self.pending[notice.key] = notice
+        return True
+
+    def is_blocked(self, user_id):
+        expires = self.blocked.get(user_id)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self.blocked[user_id]
+            return False
+        return True
+
+    def _retry_later(self, notice, delay):
+        def _requeue():
+            if notice.key not in self.pending:
+                self.pending[notice.key] = notice
+                try:
+                    self.queue.put_nowait(notice.key)
+                except asyncio.QueueFull:
+                    del self.pending[notice.key]
+                    self.failed += 1
+        asyncio.get_running_loop().call_later(delay, _requeue)
+
+    async def _deliver(self, notice):
+        member = notice.member
+        if self.is_blocked(member.id):
+            await self.fallback(member, notice.embed)
+            return
+        wait = self.route_reset.get(member.id, 0) - time.monotonic()
+        if wait > 0:
+            self._retry_later(notice, wait)
+            return
+        started = time.perf_counter()
+        try:
+            await member.send(embed=notice.embed)
+            self.sent += 1
+            self._observe('sent', started)
+        except discord.Forbidden:
+            self._observe('forbidden', started)
+            # Closed DMs or a blocked bot, stop trying for a while
+            self.blocked[member.id] = time.monotonic() + self.blocked_ttl
+            log.info('dm_blocked', user_id=member.id, fallback='shift_log')
+            await self.fallback(member, notice.embed)
+        except (discord.HTTPException, asyncio.TimeoutError, OSError) as e:
+            self._observe('error', started)
+            status = getattr(e, 'status', None)
+            retry_after = getattr(e, 'retry_after', None)
+            if status == 429 and retry_after:
+                self.route_reset[member.id] = time.monotonic() + retry_after
+            if notice.attempts >= self.max_retries or (status and 400 <= status < 500 and status != 429):
+                self.failed += 1
+                log.warning('dm_failed', kind=notice.kind, user_id=member.id, attempts=notice.attempts, error=str(e))
+                return
+            notice.attempts += 1
+            delay = retry_after or self.backoff * 2 ** (notice.attempts - 1)
+            self._retry_later(notice, delay + random.uniform(0, 1))
+
+    def _observe(self, outcome, started):
+        if self.observer is not None:
+            self.observer(outcome, time.perf_counter() - started)
+
+    async def _worker(self):
+        while True:
+            key = await self.queue.get()
+            notice = self.pending.pop(key, None)
+            try:
+                if notice is not None:
+                    await self._deliver(notice)
+            except Exception:
+                self.failed += 1
+                log.exception('dm_error', kind=key[1], user_id=key[0])
+            finally:
+                self.queue.task_done()
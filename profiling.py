@@ -0,0 +1,72 @@
+import asyncio
+import cProfile
+import functools
+import io
+import pstats
+import time
+from collections import deque
+
+# --- Handler timing and on-demand profiling ---
+# SlowCallLog.timed() wraps event handlers and task iterations, and
+# record() takes timings from hooks that already measure (commands, store
+# and DM observers). Anything slower than the threshold lands in a short
+# rolling log for *debug, next to per-name call counts and worst times.
+# capture_profile() runs cProfile over the event loop thread for a few
+# seconds and returns a pstats report; worker threads are not included.
+
+class SlowCallLog:
+    def __init__(self, threshold=0.25, size=50):
+        self.threshold = threshold
+        self.recent = deque(maxlen=size)
+        # name -> [calls, total seconds, worst seconds]
+        self.stats = {}
+
+    def record(self, name, seconds):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+        if seconds >= self.threshold:
+            self.recent.append((time.time(), name, seconds))
+
+    def timed(self, name=None):
+        """Decorator recording every call of a coroutine function under name (default its own)"""
+        def decorator(func):
+            label = name or func.__name__
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.record(label, time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def slowest(self, limit=10):
+        """(name, calls, mean, worst) with the worst single calls first"""
+        rows = [(name, calls, total / calls, worst) for name, (calls, total, worst) in self.stats.items()]
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows[:limit]
+
+_profile_lock = asyncio.Lock()
+
+def profile_busy():
+    return _profile_lock.locked()
+
+async def capture_profile(seconds, limit=40, sort='cumulative'):
+    """Profile everything the event loop runs for `seconds`, returns the top `limit` functions as text"""
+    async with _profile_lock:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
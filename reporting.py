@@ -0,0 +1,128 @@
+import hashlib
+import hmac
+import json
+import secrets
+from collections import OrderedDict
+
+from aiohttp import web
+
+# --- Read-only reporting API ---
+# JSON reports for dashboards on the bot's web server. Every request needs
+# `Authorization: Bearer <REPORT_API_TOKEN>`. A report's ETag is derived from
+# the request, the store's data version and an id drawn at startup (the
+# version counter starts over in every process), so a poll with a matching
+# If-None-Match gets a 304 without the report being built. Built bodies are
+# kept per data version in a small LRU; large ones are streamed instead.
+#
+# Reports are registered by name and take a dict of string parameters, so
+# the same report can be rendered for an HTTP request or over cluster IPC.
+
+class ReportError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class JsonStream:
+    """A report too large to cache: ``head`` fields plus a list written out in chunks"""
+
+    def __init__(self, head, field, items, chunk_size=500):
+        self.head = head
+        self.field = field
+        self.items = items
+        self.chunk_size = chunk_size
+
+    def collect(self):
+        return dict(self.head, **{self.field: list(self.items)})
+
+    async def send(self, response):
+        head = json.dumps(self.head, separators=(',', ':'))[:-1]
+        await response.write(f'{head}{"," if self.head else ""}"{self.field}":['.encode())
+        for i in range(0, len(self.items), self.chunk_size):
+            chunk = ','.join(json.dumps(item, separators=(',', ':')) for item in self.items[i:i + self.chunk_size])
+            await response.write(((',' if i else '') + chunk).encode())
+        await response.write(b']}')
+
+def make_etag(key, version):
+    return '"' + hashlib.sha1(repr((key, version)).encode()).hexdigest()[:20] + '"'
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = (tag.strip() for tag in if_none_match.split(','))
+    return any(tag == '*' or tag.removeprefix('W/') == etag for tag in candidates)
+
+class ReportingAPI:
+    def __init__(self, token, version, forward=None, cache_size=256):
+        """``version()`` returns the current data version; ``forward(name, params, if_none_match)``
+        may return (status, etag, payload) from another process, or None to render locally"""
+        self.token = token
+        self.version = version
+        self.forward = forward
+        self.cache_size = cache_size
+        self.boot_id = secrets.token_hex(8)
+        self.reports = {}
+        self._cache = OrderedDict()
+
+    def report(self, name, path, key=None):
+        """Register ``build(params)`` as a report served at GET path.
+
+        ``key(params)`` can add state the data version does not cover, such
+        as the guild's mod list, to the cache key.
+        """
+        def decorator(build):
+            self.reports[name] = (path, build, key)
+            return build
+        return decorator
+
+    async def render(self, name, params, if_none_match=None):
+        """(status, etag, payload); payload is None for a 304 and may be a JsonStream"""
+        _, build, key = self.reports[name]
+        try:
+            cache_key = (name, tuple(sorted(params.items())), key(params) if key else None)
+            etag = make_etag(cache_key, (self.boot_id, self.version()))
+            if etag_matches(if_none_match, etag):
+                return 304, etag, None
+            cached = self._cache.get(cache_key)
+            if cached is not None and cached[0] == etag:
+                self._cache.move_to_end(cache_key)
+                return 200, etag, cached[1]
+            payload = await build(params)
+        except ReportError as e:
+            return e.status, None, {'error': e.message}
+        if not isinstance(payload, JsonStream):
+            self._cache[cache_key] = (etag, payload)
+            self._cache.move_to_end(cache_key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return 200, etag, payload
+
+    def _authorized(self, request):
+        header = request.headers.get('Authorization', '')
+        return bool(self.token) and hmac.compare_digest(header, f'Bearer {self.token}')
+
+    def _handler(self, name):
+        async def handle(request):
+            if not self._authorized(request):
+                return web.json_response({'error': 'unauthorized'}, status=401)
+            params = dict(request.query)
+            params.update(request.match_info)
+            if_none_match = request.headers.get('If-None-Match')
+            result = await self.forward(name, params, if_none_match) if self.forward else None
+            status, etag, payload = result or await self.render(name, params, if_none_match)
+            headers = {'ETag': etag, 'Cache-Control': 'no-cache'} if etag else {}
+            if status == 304:
+                return web.Response(status=304, headers=headers)
+            if isinstance(payload, JsonStream):
+                response = web.StreamResponse(status=status, headers=headers)
+                response.content_type = 'application/json'
+                await response.prepare(request)
+                await payload.send(response)
+                await response.write_eof()
+                return response
+            return web.json_response(payload, status=status, headers=headers)
+        return handle
+
+    def add_routes(self, app):
+        for name, (path, _, _) in self.reports.items():
+            app.router.add_get(path, self._handler(name))
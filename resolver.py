@@ -0,0 +1,154 @@
+import discord
+
+# --- Cached role / channel resolution ---
+# Looking up the mod role and shift log channel by name is a linear scan over
+# guild.roles / guild.text_channels. The resolver does that once per guild and
+# keeps the result, plus the set of mod-role member ids, current from gateway
+# events so "is this user a mod" is a set lookup.
+#
+# With a lean member cache (no chunking at startup) role.members only holds
+# members the bot has already seen. The resolver then also learns mods from
+# the Member objects that come with their messages, which carry current
+# roles, and load_mods() fetches candidates by id so that mod lists are
+# complete without caching anyone. Learned mods outlive invalidate(). They
+# get no update events, so a lost role is noticed on their next command.
+
+class GuildEntry:
+    __slots__ = ('role', 'channel', 'mod_ids')
+
+    def __init__(self, role, channel, mod_ids):
+        self.role = role
+        self.channel = channel
+        self.mod_ids = mod_ids
+
+class GuildResolver:
+    def __init__(self, names, lean=False):
+        """names(guild_id) returns the (mod role name, shift log channel name) for a guild;
+        lean is True when the member cache only holds members the bot has seen"""
+        self.names = names
+        self.lean = lean
+        self.entries = {}
+        # {guild_id: {user_id: Member}} of mods that are not in the member cache, lean mode only
+        self.learned = {}
+
+    def refresh(self, guild):
+        """Resolve the role and channel for a guild from scratch"""
+        role_name, channel_name = self.names(guild.id)
+        role = discord.utils.get(guild.roles, name=role_name)
+        channel = discord.utils.get(guild.text_channels, name=channel_name)
+        mod_ids = {member.id for member in role.members} if role else set()
+        if role is not None:
+            mod_ids |= {user_id for user_id, member in self.learned.get(guild.id, {}).items() if role in member.roles}
+        entry = self.entries[guild.id] = GuildEntry(role, channel, mod_ids)
+        return entry
+
+    def _entry(self, guild):
+        entry = self.entries.get(guild.id)
+        return entry if entry is not None else self.refresh(guild)
+
+    def invalidate(self, guild_id):
+        """Look the role and channel up again on next use, e.g. after a settings change"""
+        self.entries.pop(guild_id, None)
+
+    def forget(self, guild_id):
+        self.entries.pop(guild_id, None)
+        self.learned.pop(guild_id, None)
+
+    # --- Lookups ---
+    def mod_role(self, guild):
+        return self._entry(guild).role
+
+    def log_channel(self, guild):
+        return self._entry(guild).channel
+
+    def is_mod(self, member):
+        guild = getattr(member, 'guild', None)
+        if guild is None:
+            return False
+        entry = self._entry(guild)
+        if not self.lean:
+            return member.id in entry.mod_ids
+        # The member may not be cached, so no update event would tell us about
+        # role changes; the roles on the member we were handed are current
+        learned = self.learned.setdefault(guild.id, {})
+        if entry.role is not None and entry.role in member.roles:
+            entry.mod_ids.add(member.id)
+            if guild.get_member(member.id) is None:
+                learned[member.id] = member
+            return True
+        entry.mod_ids.discard(member.id)
+        learned.pop(member.id, None)
+        return False
+
+    def mod_ids(self, guild):
+        return self._entry(guild).mod_ids
+
+    def member(self, guild, user_id):
+        """Member object for a user, from the member cache or the mods learned in lean mode"""
+        member = guild.get_member(user_id)
+        if member is None:
+            member = self.learned.get(guild.id, {}).get(user_id)
+        return member
+
+    def mods(self, guild):
+        """Member objects holding the mod role, O(mods)"""
+        members = (self.member(guild, user_id) for user_id in self._entry(guild).mod_ids)
+        return [member for member in members if member is not None]
+
+    async def load_mods(self, guild, user_ids):
+        """Fetch the given members that are not known yet and keep the mods among them, caching no one"""
+        entry = self._entry(guild)
+        learned = self.learned.get(guild.id, {})
+        missing = [user_id for user_id in user_ids
+                   if guild.get_member(user_id) is None and user_id not in learned]
+        if entry.role is None or not missing:
+            return 0
+        found = 0
+        # The gateway member request takes at most 100 ids at a time
+        for i in range(0, len(missing), 100):
+            members = await guild.query_members(user_ids=missing[i:i + 100], cache=False)
+            for member in members:
+                if entry.role in member.roles:
+                    entry.mod_ids.add(member.id)
+                    self.learned.setdefault(guild.id, {})[member.id] = member
+                    found += 1
+        return found
+
+    # --- Event hooks ---
+    def on_role_change(self, before, after=None):
+        """Role created, updated or deleted"""
+        entry = self.entries.get(before.guild.id)
+        if entry is None:
+            return
+        role_name = self.names(before.guild.id)[0]
+        roles = (before, after) if after is not None else (before,)
+        if any(role.name == role_name or (entry.role and role.id == entry.role.id) for role in roles):
+            self.refresh(before.guild)
+
+    def on_channel_change(self, before, after=None):
+        """Channel created, updated or deleted"""
+        entry = self.entries.get(before.guild.id)
+        if entry is None:
+            return
+        channel_name = self.names(before.guild.id)[1]
+        channels = (before, after) if after is not None else (before,)
+        if any(channel.name == channel_name or (entry.channel and channel.id == entry.channel.id)
+               for channel in channels):
+            self.refresh(before.guild)
+
+    def on_member_update(self, before, after):
+        entry = self.entries.get(after.guild.id)
+        if entry is None or entry.role is None:
+            return
+        if entry.role in after.roles:
+            entry.mod_ids.add(after.id)
+        else:
+            entry.mod_ids.discard(after.id)
+        # Only cached members get update events, the cache copy stays current
+        self.learned.get(after.guild.id, {}).pop(after.id, None)
+
+    def on_member_remove(self, member):
+        entry = self.entries.get(member.guild.id)
+        if entry is not None:
+            entry.mod_ids.discard(member.id)
+        self.learned.get(member.guild.id, {}).pop(member.id, None)
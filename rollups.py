@@ -0,0 +1,98 @@
+from datetime import datetime
+
+# --- Daily rollup counters ---
+# Per-user, per-day (in the bot's timezone) event counts, updated as events
+# are recorded. "Today", "last 7 days" and any date range are a sum over day
+# buckets instead of a scan over the user's whole history.
+#
+# Counters are kept per (guild_id, user_id) when the store keeps each guild's
+# history apart, so a mod in several guilds is counted in each separately.
+# With a store that ignores guild_id the guild part of the key is None.
+
+class DailyRollups:
+    def __init__(self, tz, kinds=('shifts', 'checkins', 'missed'), per_guild=True):
+        self.tz = tz
+        self.kinds = kinds
+        self.per_guild = per_guild
+        # {(guild_id, user_id): {kind: {day: count}}}
+        self.counts = {}
+        self._rebuild_log = None
+
+    def _key(self, guild_id, user_id):
+        return (guild_id if self.per_guild else None, int(user_id))
+
+    def day(self, ts):
+        """Day bucket (proleptic ordinal) of an epoch timestamp"""
+        return datetime.fromtimestamp(ts, self.tz).date().toordinal()
+
+    def today(self):
+        return datetime.now(self.tz).date().toordinal()
+
+    def _add(self, counts, key, kind, ts):
+        days = counts.setdefault(key, {}).setdefault(kind, {})
+        bucket = self.day(ts)
+        days[bucket] = days.get(bucket, 0) + 1
+
+    def add(self, guild_id, user_id, kind, ts):
+        if kind not in self.kinds:
+            return
+        key = self._key(guild_id, user_id)
+        self._add(self.counts, key, kind, ts)
+        if self._rebuild_log is not None:
+            self._rebuild_log.append((key, kind, ts))
+
+    def count(self, guild_id, user_id, kind, first_day, last_day):
+        """Events of a kind between two day buckets, inclusive; guild_id None counts every guild"""
+        if guild_id is None and self.per_guild:
+            return sum(self._count(key, kind, first_day, last_day) for key in self.counts if key[1] == int(user_id))
+        return self._count(self._key(guild_id, user_id), kind, first_day, last_day)
+
+    def _count(self, key, kind, first_day, last_day):
+        days = self.counts.get(key, {}).get(kind)
+        if not days:
+            return 0
+        if last_day - first_day + 1 > len(days):
+            return sum(n for d, n in days.items() if first_day <= d <= last_day)
+        return sum(days.get(d, 0) for d in range(first_day, last_day + 1))
+
+    def count_today(self, guild_id, user_id, kind):
+        today = self.today()
+        return self.count(guild_id, user_id, kind, today, today)
+
+    def summary(self, guild_id, kinds, first_day, last_day):
+        """{user_id: {kind: count}} for every user with rollups in a guild, or summed over every guild when None"""
+        summary = {}
+        for key in self.counts:
+            if guild_id is not None and self.per_guild and key[0] != guild_id:
+                continue
+            counts = summary.setdefault(key[1], dict.fromkeys(kinds, 0))
+            for kind in kinds:
+                counts[kind] += self._count(key, kind, first_day, last_day)
+        return summary
+
+    async def rebuild(self, store):
+        """Recompute every counter from the store's raw history"""
+        self._rebuild_log = []
+        try:
+            events = await store.load_events(self.kinds)
+        except BaseException:
+            self._rebuild_log = None
+            raise
+        # Events recorded while the history was loading may or may not be in it
+        racing = {}
+        for event in self._rebuild_log:
+            racing[event] = racing.get(event, 0) + 1
+        self._rebuild_log = None
+
+        counts = {}
+        for guild_id, user_id, kind, ts in events:
+            key = self._key(guild_id, user_id)
+            event = (key, kind, ts)
+            if racing.get(event):
+                racing[event] -= 1
+            self._add(counts, key, kind, ts)
+        for (key, kind, ts), remaining in racing.items():
+            for _ in range(remaining):
+                self._add(counts, key, kind, ts)
+        self.counts = counts
+        return len(events)
@@ -0,0 +1,76 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# --- Check-in deadline scheduler ---
+# Each shift has exactly one pending deadline: the next reminder or the next
+# miss. Shifts are told apart by (guild_id, user_id) when the store keeps a
+# shift per guild, else by user alone. Deadlines live in a heap and the run
+# loop sleeps until the earliest one, so mods who are off shift cost nothing
+# and deadlines fire on time instead of on the next polling tick.
+
+class DeadlineScheduler:
+    def __init__(self, callback, per_guild=True):
+        """callback(user_id, guild_id, kind, base) is awaited when a deadline is due"""
+        self.callback = callback
+        self.per_guild = per_guild
+        self._heap = []
+        # {(guild_id, user_id): seq of the live heap entry}
+        self._pending = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _key(self, guild_id, user_id):
+        return (guild_id if self.per_guild else None, user_id)
+
+    def schedule(self, user_id, guild_id, kind, when, base):
+        """Set the next deadline of the user's shift in guild_id, replacing any pending one.
+
+        ``base`` is the time the current check-in window started (shift
+        start, last check-in or last miss); it is handed back to the callback.
+        """
+        seq = next(self._counter)
+        self._pending[self._key(guild_id, user_id)] = seq
+        heapq.heappush(self._heap, (when, seq, user_id, guild_id, kind, base))
+        if self._heap[0][1] == seq:
+            # New earliest deadline, make the run loop recompute its sleep
+            self._wakeup.set()
+
+    def cancel(self, user_id, guild_id):
+        # The heap entry stays behind and is skipped once it comes due
+        self._pending.pop(self._key(guild_id, user_id), None)
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, seq, user_id, guild_id, kind, base = heapq.heappop(self._heap)
+            key = self._key(guild_id, user_id)
+            if self._pending.get(key) != seq:
+                continue  # Cancelled or replaced
+            del self._pending[key]
+            due.append((user_id, guild_id, kind, base))
+        return due
+
+    async def run(self):
+        while True:
+            self._wakeup.clear()
+            for user_id, guild_id, kind, base in self._pop_due(time.time()):
+                try:
+                    await self.callback(user_id, guild_id, kind, base)
+                except Exception:
+                    log.exception('deadline_error', kind=kind, user_id=user_id)
+            timeout = None
+            if self._heap:
+                timeout = max(0, self._heap[0][0] - time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,243 @@
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections.abc import MutableMapping
+from datetime import datetime
+
+# --- Binary snapshot format ---
+# A compact alternative to the pretty JSON in mod_data.json. All timestamps
+# are epoch seconds stored as int64, and a header lists every user with the
+# offset of their records, so opening a snapshot is an mmap plus a table
+# read. A user's records are decoded the first time they are touched.
+#
+#   header   magic, version, user count, archive cutoff (NaN if none),
+#            sequence number of the last journal op folded in
+#   table    per user: id, word offset, open shift start, record counts
+#   body     per user: shifts as (start, end) pairs, check-ins, misses,
+#            recent messages as (channel id, ts) pairs, all int64
+#
+# Every section is a whole number of 8 byte words, so offsets are counted in
+# words. Version 1 files have no journal sequence number and read as 0.
+
+MAGIC = b'MODSNAP\x00'
+VERSION = 2
+PREFIX = struct.Struct('<8sI')
+HEADERS = {1: struct.Struct('<8sIId'), 2: struct.Struct('<8sIIdq')}
+HEADER = HEADERS[VERSION]
+# mod_data.json keeps the journal sequence number under this key
+JSON_SEQ_KEY = '_journal_seq'
+ENTRY = struct.Struct('<qqqIIII')
+WORD = 8
+NO_TIME = -(2 ** 63)
+
+def _epoch(value):
+    return int(datetime.fromisoformat(value).timestamp())
+
+def _words(values):
+    words = array('q', values)
+    if sys.byteorder == 'big':
+        words.byteswap()
+    return words.tobytes()
+
+def encode_user(user_data):
+    """Encode one user's JSON records, returns (counts, open shift start, body bytes)"""
+    shifts = user_data.get('shifts', [])
+    checkins = user_data.get('checkins', [])
+    missed = user_data.get('missed', [])
+    messages = user_data.get('recent_messages', [])
+    words = []
+    open_start = NO_TIME
+    for shift in shifts:
+        start = _epoch(shift['start'])
+        words.append(start)
+        if shift.get('end') is None:
+            words.append(NO_TIME)
+            open_start = start
+        else:
+            words.append(_epoch(shift['end']))
+    words.extend(_epoch(ts) for ts in checkins)
+    words.extend(_epoch(ts) for ts in missed)
+    for msg in messages:
+        words.append(int(msg['channel_id']))
+        words.append(_epoch(msg['timestamp']))
+    counts = (len(shifts), len(checkins), len(missed), len(messages))
+    return counts, open_start, _words(words)
+
+def write_snapshot(path, data, archive_cutoff=None, journal_seq=0):
+    """Write a JSON-shaped data dict as a binary snapshot, atomically"""
+    users = sorted((int(user_id), encode_user(user_data)) for user_id, user_data in data.items())
+    offset = (HEADER.size + ENTRY.size * len(users)) // WORD
+    table, body = [], []
+    for user_id, (counts, open_start, payload) in users:
+        table.append(ENTRY.pack(user_id, offset, open_start, *counts))
+        body.append(payload)
+        offset += len(payload) // WORD
+    cutoff = float('nan') if archive_cutoff is None else archive_cutoff
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(users), cutoff, journal_seq))
+        f.writelines(table)
+        f.writelines(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class SnapshotReader:
+    """Memory-mapped view of a binary snapshot"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = PREFIX.unpack_from(self._map, 0)
+        header = HEADERS.get(version)
+        if magic != MAGIC or header is None:
+            raise ValueError(f"{path} is not a mod data snapshot this version can read")
+        _, _, count, cutoff, *journal_seq = header.unpack_from(self._map, 0)
+        self.archive_cutoff = None if math.isnan(cutoff) else cutoff
+        self.journal_seq = journal_seq[0] if journal_seq else 0
+        self.entries = {
+            str(entry[0]): entry[1:]
+            for entry in ENTRY.iter_unpack(self._map[header.size:header.size + ENTRY.size * count])
+        }
+
+    def _read(self, offset, count):
+        words = array('q')
+        words.frombytes(self._map[offset * WORD:(offset + count) * WORD])
+        if sys.byteorder == 'big':
+            words.byteswap()
+        return words
+
+    def open_shift(self, user_id):
+        return None if self.entries[user_id][1] == NO_TIME else self.entries[user_id][1]
+
+    def arrays(self, user_id):
+        """(shift pairs, checkins, missed, message pairs) as int64 arrays"""
+        offset, _, n_shifts, n_checkins, n_missed, n_messages = self.entries[user_id]
+        sections = []
+        for width in (2 * n_shifts, n_checkins, n_missed, 2 * n_messages):
+            sections.append(self._read(offset, width))
+            offset += width
+        return sections
+
+    def epochs(self, user_id, kind):
+        """Timestamps of one kind without decoding the rest of the user"""
+        shifts, checkins, missed, messages = self.arrays(user_id)
+        if kind == 'shifts':
+            return list(shifts[0::2])
+        if kind == 'activity':
+            return list(messages[1::2])
+        return list(checkins if kind == 'checkins' else missed)
+
+    def messages(self, user_id):
+        """(channel_id, ts) of the user's recent monitored messages"""
+        messages = self.arrays(user_id)[3]
+        return list(zip(messages[0::2], messages[1::2]))
+
+    def decode(self, user_id, tz):
+        """The user's records in the mod_data.json layout"""
+        def iso(ts):
+            return datetime.fromtimestamp(ts, tz).isoformat()
+        shifts, checkins, missed, messages = self.arrays(user_id)
+        return {
+            'shifts': [{'start': iso(start), 'end': None if end == NO_TIME else iso(end)}
+                       for start, end in zip(shifts[0::2], shifts[1::2])],
+            'missed': [iso(ts) for ts in missed],
+            'checkins': [iso(ts) for ts in checkins],
+            'recent_messages': [{'channel_id': channel_id, 'timestamp': iso(ts)}
+                                for channel_id, ts in zip(messages[0::2], messages[1::2])],
+        }
+
+    def decode_all(self, tz):
+        return {user_id: self.decode(user_id, tz) for user_id in self.entries}
+
+class LazyUsers(MutableMapping):
+    """The store's data dict, backed by a snapshot until a user is first read or written"""
+
+    def __init__(self, reader, tz):
+        self.reader = reader
+        self.tz = tz
+        self._decoded = {}
+        self._pending = set(reader.entries)
+
+    def is_pending(self, user_id):
+        """True while a user's records are still only in the snapshot"""
+        return user_id in self._pending
+
+    def __getitem__(self, user_id):
+        if user_id in self._pending:
+            self._decoded[user_id] = self.reader.decode(user_id, self.tz)
+            self._pending.discard(user_id)
+        return self._decoded[user_id]
+
+    def __setitem__(self, user_id, user_data):
+        self._pending.discard(user_id)
+        self._decoded[user_id] = user_data
+
+    def __delitem__(self, user_id):
+        if user_id in self._pending:
+            self._pending.discard(user_id)
+        else:
+            del self._decoded[user_id]
+
+    def __contains__(self, user_id):
+        return user_id in self._pending or user_id in self._decoded
+
+    def __iter__(self):
+        yield from list(self._decoded)
+        yield from list(self._pending)
+
+    def __len__(self):
+        return len(self._decoded) + len(self._pending)
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    import pytz
+
+    parser = argparse.ArgumentParser(description='Convert mod data between JSON and the binary snapshot format')
+    parser.add_argument('command', choices=('to-binary', 'to-json', 'report'))
+    parser.add_argument('source', help='mod_data.json for to-binary and report, a .snap file for to-json')
+    parser.add_argument('target', nargs='?', help='file to write (report: binary snapshot to compare with)')
+    parser.add_argument('--tz', default='Asia/Karachi', help='timezone for timestamps written back to JSON')
+    args = parser.parse_args()
+    tz = pytz.timezone(args.tz)
+
+    if args.command == 'to-binary':
+        with open(args.source) as f:
+            data = json.load(f)
+        journal_seq = data.pop(JSON_SEQ_KEY, 0)
+        write_snapshot(args.target or os.path.splitext(args.source)[0] + '.snap', data, journal_seq=journal_seq)
+        print(f"✅ Wrote {len(data)} users")
+    elif args.command == 'to-json':
+        reader = SnapshotReader(args.source)
+        data = reader.decode_all(tz)
+        data[JSON_SEQ_KEY] = reader.journal_seq
+        with open(args.target or os.path.splitext(args.source)[0] + '.json', 'w') as f:
+            json.dump(data, f, indent=2)
+        print(f"✅ Wrote {len(reader.entries)} users")
+    else:
+        snap_path = args.target or os.path.splitext(args.source)[0] + '.snap'
+        started = time.perf_counter()
+        with open(args.source) as f:
+            data = json.load(f)
+        data.pop(JSON_SEQ_KEY, None)
+        json_load = time.perf_counter() - started
+        if not os.path.exists(snap_path):
+            write_snapshot(snap_path, data)
+        started = time.perf_counter()
+        reader = SnapshotReader(snap_path)
+        binary_open = time.perf_counter() - started
+        started = time.perf_counter()
+        reader.decode_all(tz)
+        binary_decode = time.perf_counter() - started
+        print(f"Users:                 {len(data)}")
+        print(f"JSON size:             {os.path.getsize(args.source):,} bytes")
+        print(f"Snapshot size:         {os.path.getsize(snap_path):,} bytes")
+        print(f"JSON load:             {json_load * 1000:.1f} ms")
+        print(f"Snapshot open:         {binary_open * 1000:.1f} ms")
+        print(f"Snapshot decode (all): {binary_decode * 1000:.1f} ms")
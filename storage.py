@@ -0,0 +1,976 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from archive import (ARCHIVED_KINDS, ArchiveSegments, is_archivable, item_ts, month_of,
+                     prune_archived, retention_cutoff)
+from logs import get_logger
+from snapshot import JSON_SEQ_KEY, NO_TIME, LazyUsers, SnapshotReader, write_snapshot
+
+log = get_logger(__name__)
+
+# Event kinds shared by every backend. Timestamps are epoch seconds.
+EVENT_KINDS = ('shifts', 'checkins', 'missed', 'activity')
+
+DURABILITY_MODES = ('async', 'sync', 'fsync')
+
+# Days of monitored-channel messages the SQLite store keeps, enough for the
+# longest *analytics range
+ACTIVITY_KEEP_DAYS = 90
+
+SNAPSHOT_FORMATS = ('json', 'binary')
+
+# The weekly report and daily counters are rebuilt from the hot window, which
+# has to cover at least the last 7 days
+MIN_RETENTION_MONTHS = 2
+
+def empty_user():
+    return {'shifts': [], 'missed': [], 'checkins': [], 'recent_messages': []}
+
+def to_epoch(time_str):
+    return datetime.fromisoformat(time_str).timestamp()
+
+# --- Store interface ---
+class Store:
+    """Base class for mod data backends.
+
+    All methods are coroutines so a backend is free to do its I/O off the
+    event loop. ``guild_id`` may be None in queries to mean every guild.
+    Set ``observer`` to a callable(op, seconds) to time persistence work.
+    """
+
+    observer = None
+    # False for a backend that ignores guild_id and keeps one history per user
+    per_guild = True
+    # Bumped on every shift, check-in and miss write; reports cache against it
+    version = 0
+    # Phase timings of the last load(), for the startup report
+    load_timings = {}
+
+    def _observe(self, op, started):
+        if self.observer is not None:
+            self.observer(op, time.perf_counter() - started)
+
+    async def start_shift(self, guild_id, user_id, ts):
+        raise NotImplementedError
+
+    async def end_shift(self, guild_id, user_id, ts):
+        """Close the user's open shift, if any"""
+        raise NotImplementedError
+
+    async def add_checkin(self, guild_id, user_id, ts):
+        raise NotImplementedError
+
+    async def add_missed(self, guild_id, user_id, ts):
+        raise NotImplementedError
+
+    async def add_activity(self, guild_id, user_id, channel_id, ts):
+        raise NotImplementedError
+
+    async def open_shift(self, guild_id, user_id):
+        """Start timestamp of the user's open shift, or None"""
+        raise NotImplementedError
+
+    async def open_shifts(self):
+        """(guild_id, user_id, start) for every open shift, used to rebuild reminders at startup"""
+        raise NotImplementedError
+
+    async def last_event(self, guild_id, user_id, kind):
+        """Timestamp of the user's most recent checkin/missed event, or None"""
+        raise NotImplementedError
+
+    async def count_events(self, guild_id, user_id, kind, start=None, end=None):
+        """Number of events of a kind in [start, end)"""
+        raise NotImplementedError
+
+    async def event_times(self, guild_id, user_id, kind, start=None, end=None):
+        """Sorted timestamps of a user's events of a kind in [start, end)"""
+        raise NotImplementedError
+
+    async def load_activity(self, since):
+        """(user_id, channel_id, ts) for every monitored message at or after since, oldest first"""
+        raise NotImplementedError
+
+    async def totals(self, guild_id, user_id):
+        """All-time shift, checkin and missed counts for a user"""
+        counts = {}
+        for kind in ('shifts', 'checkins', 'missed'):
+            counts[kind] = await self.count_events(guild_id, user_id, kind)
+        return counts
+
+    async def event_counts(self, guild_id, kinds, start=None, end=None):
+        """Per-user counts for a range, as {user_id: {kind: count}}"""
+        raise NotImplementedError
+
+    async def load_events(self, kinds):
+        """(guild_id, user_id, kind, ts) for every recorded event of the given kinds still in the hot store"""
+        raise NotImplementedError
+
+    async def events_between(self, guild_id, kinds, start, end):
+        """(user_id, kind, ts) for every event of the given kinds in [start, end), archived ones included"""
+        raise NotImplementedError
+
+    async def shift_intervals(self, guild_id, start, end):
+        """(user_id, start, end) of every shift overlapping [start, end); end is None while the shift is open"""
+        raise NotImplementedError
+
+    async def set_retention(self, months):
+        """Keep `months` calendar months, the current one included, in the hot store"""
+        raise NotImplementedError
+
+    async def archive_history(self):
+        """Move records older than the retention window out of the hot store, returns how many moved"""
+        return 0
+
+    async def retention_status(self):
+        """Retention settings and archive state for reports, or None if the backend keeps everything hot"""
+        return None
+
+    async def flush(self):
+        """Write anything buffered to disk"""
+
+    async def run(self):
+        """Background maintenance loop, started once the bot is ready"""
+
+    def close(self):
+        """Flush everything to disk, called at shutdown"""
+
+# --- Write-behind journal store ---
+# Every mutation is appended to DATA_FILE + '.journal' as one JSON line.
+# The journal is periodically folded into DATA_FILE (the snapshot) by a
+# worker thread, so the event loop never re-serializes the whole store.
+# Ops carry an increasing sequence number and the snapshot records the last
+# one folded into it, so a journal that is replayed again after a crash
+# mid-compaction is not applied twice.
+
+def apply_op(data, op):
+    """Apply a single journal operation to a data dict"""
+    if op['op'] == 'archive':
+        # Records before the cutoff were moved to archive segments, see archive.py
+        prune_archived(data, op['before'])
+        return
+    user_data = data.setdefault(op['user'], empty_user())
+    kind = op['op']
+    if kind == 'append':
+        items = user_data.setdefault(op['field'], [])
+        items.append(op['value'])
+        limit = op.get('limit')
+        if limit and len(items) > limit:
+            del items[:len(items) - limit]
+    elif kind == 'end_shift':
+        for shift in reversed(user_data['shifts']):
+            if shift['end'] is None:
+                shift['end'] = op['end']
+                break
+    else:
+        raise ValueError(f"Unknown journal op: {kind}")
+
+def drop_message_content(data):
+    """Strip message content that older versions kept in recent_messages"""
+    for user_data in data.values():
+        for msg in user_data.get('recent_messages', []):
+            msg.pop('content', None)
+    return data
+
+def read_snapshot(path):
+    """(data, sequence number of the last journal op in it) of a JSON snapshot"""
+    if not os.path.exists(path):
+        return {}, 0
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return {}, 0
+    return data, data.pop(JSON_SEQ_KEY, 0)
+
+def replay_journal(data, path, after=0):
+    """Replay the ops of a journal file numbered above `after` on top of data.
+
+    Returns (ops applied, highest sequence number seen). Ops written before
+    sequence numbers existed have none and are always applied.
+    """
+    if not os.path.exists(path):
+        return 0, after
+    applied, last_seq = 0, after
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                op = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn write at the tail of the journal, everything before it is intact
+                break
+            seq = op.get('seq')
+            if seq is not None:
+                if seq <= after:
+                    continue  # Already in the snapshot
+                last_seq = max(last_seq, seq)
+            apply_op(data, op)
+            applied += 1
+    return applied, last_seq
+
+def write_atomic(path, data):
+    """Write data as JSON to a temp file and rename it over path"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class JournalStore(Store):
+    """The mod_data.json backend. Keeps the hot window in memory, keyed by user id.
+
+    Older shifts, check-ins and misses live in ``archive`` and are read back
+    only for queries that reach into them. The JSON layout predates guild
+    support, so ``guild_id`` is ignored.
+    """
+
+    per_guild = False
+
+    def __init__(self, path, tz, flush_interval=1.0, durability='async', compact_every=5000,
+                 retention_months=MIN_RETENTION_MONTHS, snapshot_format='json'):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}, got {durability!r}")
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"snapshot_format must be one of {SNAPSHOT_FORMATS}, got {snapshot_format!r}")
+        self.path = path
+        # Binary snapshots (see snapshot.py) sit next to the JSON one
+        self.binary_path = os.path.splitext(path)[0] + '.snap'
+        self.snapshot_format = snapshot_format
+        self.journal_path = path + '.journal'
+        self.compacting_path = path + '.journal.compacting'
+        self.tz = tz
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self.compact_every = compact_every
+        self.default_retention = max(retention_months, MIN_RETENTION_MONTHS)
+        self.archive = ArchiveSegments(os.path.splitext(path)[0] + '.archive', tz)
+        self.data = {}
+        self._pending = []
+        self._journal_ops = 0
+        self._seq = 0
+        self._journal_file = None
+        self._io_lock = threading.Lock()
+        self._compact_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._archive_lock = asyncio.Lock()
+        self._next_archive_check = 0
+
+    # --- Loading ---
+    def _base_format(self):
+        """Format of the snapshot to load: the configured one, or the other while migrating"""
+        paths = {'json': self.path, 'binary': self.binary_path}
+        other = 'binary' if self.snapshot_format == 'json' else 'json'
+        for snapshot_format in (self.snapshot_format, other):
+            if os.path.exists(paths[snapshot_format]):
+                return snapshot_format
+        return None
+
+    def _read_base(self):
+        """The last snapshot as (plain dict, journal sequence number), whatever its format"""
+        if self._base_format() == 'binary':
+            reader = SnapshotReader(self.binary_path)
+            return reader.decode_all(self.tz), reader.journal_seq
+        return read_snapshot(self.path)
+
+    def load(self):
+        """Load the snapshot and replay any journals written since it"""
+        started = time.perf_counter()
+        base_format = self._base_format()
+        snapshot_cutoff = None
+        if base_format == 'binary':
+            # Users are decoded from the mapped file on first access
+            reader = SnapshotReader(self.binary_path)
+            self.data = LazyUsers(reader, self.tz)
+            snapshot_cutoff = reader.archive_cutoff
+            snapshot_seq = reader.journal_seq
+        else:
+            data, snapshot_seq = read_snapshot(self.path)
+            self.data = drop_message_content(data)
+        snapshot_loaded = time.perf_counter()
+        replayed, seq = replay_journal(self.data, self.compacting_path, snapshot_seq)
+        self._journal_ops, self._seq = replay_journal(self.data, self.journal_path, seq)
+        self._journal_ops += replayed
+        cutoff = self.archive.load_index()['cutoff']
+        if cutoff is not None and (snapshot_cutoff is None or snapshot_cutoff < cutoff):
+            # The archive may have been committed without its journal op making it to disk
+            prune_archived(self.data, cutoff)
+        finished = time.perf_counter()
+        self.load_timings = {
+            'format': base_format or 'empty',
+            'users': len(self.data),
+            'journal_ops': self._journal_ops,
+            'snapshot_seconds': round(snapshot_loaded - started, 4),
+            'journal_seconds': round(finished - snapshot_loaded, 4),
+        }
+        log.info('store_loaded', **self.load_timings)
+        return self.data
+
+    def user(self, user_id):
+        return self.data.get(str(user_id)) or empty_user()
+
+    def _snapshot_reader(self, user_id):
+        """The binary snapshot while user_id has not been decoded from it yet, else None"""
+        if isinstance(self.data, LazyUsers) and self.data.is_pending(user_id):
+            return self.data.reader
+        return None
+
+    def _epochs(self, user_id, kind):
+        reader = self._snapshot_reader(user_id)
+        if reader is not None:
+            return reader.epochs(user_id, kind)
+        return self._timestamps(self.user(user_id), kind)
+
+    def _iso(self, ts):
+        return datetime.fromtimestamp(ts, self.tz).isoformat()
+
+    # --- Store API ---
+    async def start_shift(self, guild_id, user_id, ts):
+        self.append(user_id, 'shifts', {'start': self._iso(ts), 'end': None})
+        await self._write_through()
+
+    async def end_shift(self, guild_id, user_id, ts):
+        self._record({'op': 'end_shift', 'user': str(user_id), 'end': self._iso(ts)})
+        await self._write_through()
+
+    async def add_checkin(self, guild_id, user_id, ts):
+        self.append(user_id, 'checkins', self._iso(ts))
+        await self._write_through()
+
+    async def add_missed(self, guild_id, user_id, ts):
+        self.append(user_id, 'missed', self._iso(ts))
+        await self._write_through()
+
+    async def add_activity(self, guild_id, user_id, channel_id, ts):
+        message_data = {'channel_id': channel_id, 'timestamp': self._iso(ts)}
+        # Keep only last 100 messages per user
+        self.append(user_id, 'recent_messages', message_data, limit=100)
+        await self._write_through()
+
+    async def open_shift(self, guild_id, user_id):
+        for shift in reversed(self.user(user_id)['shifts']):
+            if shift['end'] is None:
+                return to_epoch(shift['start'])
+        return None
+
+    async def open_shifts(self):
+        shifts = []
+        for user_id in list(self.data):
+            reader = self._snapshot_reader(user_id)
+            start = reader.open_shift(user_id) if reader is not None else await self.open_shift(None, user_id)
+            if start is not None:
+                shifts.append((None, int(user_id), start))
+        return shifts
+
+    async def last_event(self, guild_id, user_id, kind):
+        items = self.user(user_id).get(kind, [])
+        return to_epoch(items[-1]) if items else None
+
+    def _timestamps(self, user_data, kind):
+        if kind == 'shifts':
+            return [to_epoch(shift['start']) for shift in user_data.get('shifts', [])]
+        if kind == 'activity':
+            return [to_epoch(msg['timestamp']) for msg in user_data.get('recent_messages', [])]
+        return [to_epoch(item) for item in user_data.get(kind, [])]
+
+    async def count_events(self, guild_id, user_id, kind, start=None, end=None):
+        if start is None and end is None:
+            key = 'recent_messages' if kind == 'activity' else kind
+            return len(self.user(user_id).get(key, [])) + self._archived_total(user_id, kind)
+        count = sum(1 for ts in self._epochs(str(user_id), kind)
+                    if (start is None or ts >= start) and (end is None or ts < end))
+        if self._reaches_archive(kind, start):
+            archived = await self._archived_counts({str(user_id)}, (kind,), start, end)
+            count += archived.get(int(user_id), {}).get(kind, 0)
+        return count
+
+    def _archived_total(self, user_id, kind):
+        if kind not in ARCHIVED_KINDS or self.archive.cutoff is None:
+            return 0
+        return self.archive.total(user_id, kind)
+
+    def _reaches_archive(self, kind, start):
+        cutoff = self.archive.cutoff
+        return kind in ARCHIVED_KINDS and cutoff is not None and (start is None or start < cutoff)
+
+    async def _archived_counts(self, user_ids, kinds, start, end):
+        """Archived counts keyed by int user id; decompressing segments happens off the loop"""
+        started = time.perf_counter()
+        counts = await asyncio.to_thread(self.archive.counts, user_ids, kinds, start, end)
+        self._observe('archive_read', started)
+        return {int(user_id): row for user_id, row in counts.items()}
+
+    async def event_times(self, guild_id, user_id, kind, start=None, end=None):
+        times = [ts for ts in self._epochs(str(user_id), kind)
+                 if (start is None or ts >= start) and (end is None or ts < end)]
+        if self._reaches_archive(kind, start):
+            started = time.perf_counter()
+            times.extend(await asyncio.to_thread(self.archive.times, user_id, kind, start, end))
+            self._observe('archive_read', started)
+        return sorted(times)
+
+    async def load_activity(self, since):
+        records = []
+        for user_id in list(self.data):
+            reader = self._snapshot_reader(user_id)
+            if reader is not None:
+                messages = reader.messages(user_id)
+            else:
+                messages = [(msg['channel_id'], to_epoch(msg['timestamp']))
+                            for msg in self.data[user_id].get('recent_messages', [])]
+            records.extend((int(user_id), channel_id, ts) for channel_id, ts in messages if ts >= since)
+        records.sort(key=lambda record: record[2])
+        return records
+
+    # The scans below go over every hot user and parse their timestamps, which
+    # takes long enough for a big store to stall the loop, so they run in a
+    # worker thread. They only read: users still pending in a binary snapshot
+    # are read from the mapped file and never decoded into self.data there,
+    # and writes from the loop only append to or close records the scan may
+    # or may not see.
+    async def _scan(self, func, *args):
+        started = time.perf_counter()
+        result = await asyncio.to_thread(func, *args)
+        self._observe('hot_scan', started)
+        return result
+
+    def _hot_counts(self, kinds, start, end):
+        return {
+            int(user_id): {
+                kind: sum(1 for ts in self._epochs(user_id, kind)
+                          if (start is None or ts >= start) and (end is None or ts < end))
+                for kind in kinds
+            }
+            for user_id in list(self.data)
+        }
+
+    async def event_counts(self, guild_id, kinds, start=None, end=None):
+        counts = await self._scan(self._hot_counts, kinds, start, end)
+        archived_kinds = tuple(kind for kind in kinds if self._reaches_archive(kind, start))
+        if archived_kinds:
+            archived = await self._archived_counts(None, archived_kinds, start, end)
+            for user_id, row in archived.items():
+                user_counts = counts.setdefault(user_id, dict.fromkeys(kinds, 0))
+                for kind, count in row.items():
+                    user_counts[kind] += count
+        return counts
+
+    def _all_events(self, kinds):
+        events = []
+        for user_id in list(self.data):
+            for kind in kinds:
+                events.extend((None, int(user_id), kind, ts) for ts in self._epochs(user_id, kind))
+        return events
+
+    async def load_events(self, kinds):
+        return await self._scan(self._all_events, kinds)
+
+    def _hot_events(self, kinds, start, end):
+        events = []
+        for user_id in list(self.data):
+            for kind in kinds:
+                events.extend((int(user_id), kind, ts) for ts in self._epochs(user_id, kind) if start <= ts < end)
+        return events
+
+    async def events_between(self, guild_id, kinds, start, end):
+        events = await self._scan(self._hot_events, kinds, start, end)
+        archived_kinds = tuple(kind for kind in kinds if self._reaches_archive(kind, start))
+        if archived_kinds:
+            started = time.perf_counter()
+            archived = await asyncio.to_thread(self.archive.events, archived_kinds, start, end)
+            self._observe('archive_read', started)
+            events.extend((int(user_id), kind, ts) for user_id, kind, ts in archived)
+        return events
+
+    def _shift_pairs(self, user_id):
+        reader = self._snapshot_reader(user_id)
+        if reader is not None:
+            shifts = reader.arrays(user_id)[0]
+            return [(start, None if end == NO_TIME else end) for start, end in zip(shifts[0::2], shifts[1::2])]
+        return [(to_epoch(shift['start']), None if shift['end'] is None else to_epoch(shift['end']))
+                for shift in self.user(user_id)['shifts']]
+
+    def _hot_shifts(self, start, end):
+        return [(int(user_id), shift_start, shift_end)
+                for user_id in list(self.data)
+                for shift_start, shift_end in self._shift_pairs(user_id)
+                if shift_start < end and (shift_end is None or shift_end > start)]
+
+    async def shift_intervals(self, guild_id, start, end):
+        intervals = await self._scan(self._hot_shifts, start, end)
+        if self._reaches_archive('shifts', start):
+            started = time.perf_counter()
+            archived = await asyncio.to_thread(self.archive.shifts, start, end)
+            self._observe('archive_read', started)
+            intervals.extend((int(user_id), shift_start, shift_end) for user_id, shift_start, shift_end in archived)
+        return intervals
+
+    # --- Retention ---
+    @property
+    def retention_months(self):
+        return self.archive.index.get('retention_months') or self.default_retention
+
+    async def set_retention(self, months):
+        if months < MIN_RETENTION_MONTHS:
+            raise ValueError(f"Retention must be at least {MIN_RETENTION_MONTHS} months")
+        await asyncio.to_thread(self.archive.set_retention, months)
+
+    def _hot_records(self):
+        return sum(len(self._epochs(user_id, kind)) for user_id in list(self.data) for kind in ARCHIVED_KINDS)
+
+    async def retention_status(self):
+        return {
+            'retention_months': self.retention_months,
+            'cutoff': self.archive.cutoff,
+            'archived_months': self.archive.months,
+            'segments_loaded': self.archive.loads,
+            'hot_users': len(self.data),
+            'hot_records': await self._scan(self._hot_records),
+        }
+
+    def full_history(self):
+        """The hot data with every archived month merged back in, for exports"""
+        data = json.loads(json.dumps(dict(self.data)))
+        # Newest month first, each one is prepended
+        for month in reversed(self.archive.months):
+            for user_id, user_data in self.archive.segment(month).items():
+                target = data.setdefault(user_id, empty_user())
+                for kind, items in user_data.items():
+                    target[kind] = items + target.get(kind, [])
+        return data
+
+    def _collect_archivable(self, snapshot, cutoff):
+        records, moved = {}, 0
+        for user_id, user_data in snapshot.items():
+            for kind, items in user_data.items():
+                for item in items:
+                    if is_archivable(kind, item, cutoff):
+                        month = month_of(item_ts(kind, item), self.tz)
+                        user_records = records.setdefault(month, {}).setdefault(user_id, {})
+                        user_records.setdefault(kind, []).append(dict(item) if kind == 'shifts' else item)
+                        moved += 1
+        return records, moved
+
+    async def archive_history(self):
+        """Move records older than the retention window into archive segments and compact"""
+        async with self._archive_lock:
+            cutoff = retention_cutoff(datetime.now(self.tz), self.retention_months)
+            if self.archive.cutoff is not None and cutoff <= self.archive.cutoff:
+                return 0
+            started = time.perf_counter()
+            # Copy the lists, not the records: whether a record is archivable
+            # never changes once written, so later appends cannot race this
+            snapshot = {user_id: {kind: list(user_data.get(kind, [])) for kind in ARCHIVED_KINDS}
+                        for user_id, user_data in self.data.items()}
+            records, moved = await asyncio.to_thread(self._collect_archivable, snapshot, cutoff)
+            await asyncio.to_thread(self.archive.write, records, cutoff)
+            self._record({'op': 'archive', 'before': cutoff})
+            await self._write_through()
+            self._observe('archive', started)
+            log.info('history_archived', records=moved, months=len(records), cutoff=cutoff)
+        await self.compact()
+        return moved
+
+    # --- Mutations ---
+    def append(self, user_id, field, value, limit=None):
+        op = {'op': 'append', 'user': str(user_id), 'field': field, 'value': value}
+        if limit:
+            op['limit'] = limit
+        self._record(op)
+
+    def _record(self, op):
+        self._seq += 1
+        op['seq'] = self._seq
+        apply_op(self.data, op)
+        if op.get('field') != 'recent_messages':
+            self.version += 1
+        self._pending.append(json.dumps(op, separators=(',', ':')) + '\n')
+
+    async def _write_through(self):
+        """With sync or fsync durability, wait until the ops recorded so far are on disk"""
+        if self.durability != 'async':
+            await self.flush()
+
+    # --- Journal I/O ---
+    # Ops are only ever appended to _pending on the event loop, and the buffer
+    # is swapped out there too; worker threads just write the lines they were
+    # handed. flush() runs one write at a time so the journal stays in op order.
+    def _write_lines(self, lines):
+        with self._io_lock:
+            if self._journal_file is None:
+                self._journal_file = open(self.journal_path, 'a')
+            self._journal_file.writelines(lines)
+            self._journal_file.flush()
+            if self.durability == 'fsync':
+                os.fsync(self._journal_file.fileno())
+            self._journal_ops += len(lines)
+
+    def _rotate_journal(self):
+        """Move the live journal aside so it can be compacted, returns False if there is nothing to do"""
+        with self._io_lock:
+            if self._journal_file is not None:
+                self._journal_file.close()
+                self._journal_file = None
+            if os.path.exists(self.compacting_path):
+                # A previous compaction did not finish, fold that one in first
+                return True
+            if not os.path.exists(self.journal_path):
+                return False
+            os.replace(self.journal_path, self.compacting_path)
+            self._journal_ops = 0
+            return True
+
+    def _compact_files(self):
+        snapshot, seq = self._read_base()
+        _, seq = replay_journal(snapshot, self.compacting_path, seq)
+        # Everything before a committed archive cutoff is safe to drop even
+        # if its journal op has not been written yet
+        cutoff = self.archive.cutoff
+        if cutoff is not None:
+            prune_archived(snapshot, cutoff)
+        if self.snapshot_format == 'binary':
+            write_snapshot(self.binary_path, snapshot, cutoff, seq)
+            stale = self.path
+        else:
+            snapshot = drop_message_content(snapshot)
+            snapshot[JSON_SEQ_KEY] = seq
+            write_atomic(self.path, snapshot)
+            stale = self.binary_path
+        if os.path.exists(stale):
+            # Migrated to the other format, keep the old file around but out of the way
+            os.replace(stale, stale + '.migrated')
+        os.remove(self.compacting_path)
+
+    async def flush(self):
+        async with self._flush_lock:
+            lines, self._pending = self._pending, []
+            if not lines:
+                return
+            started = time.perf_counter()
+            await asyncio.to_thread(self._write_lines, lines)
+            self._observe('journal_flush', started)
+
+    async def compact(self):
+        """Fold the journal into a new snapshot without touching the live data"""
+        async with self._compact_lock:
+            await self.flush()
+            started = time.perf_counter()
+            if await asyncio.to_thread(self._rotate_journal):
+                await asyncio.to_thread(self._compact_files)
+                self._observe('compact', started)
+
+    async def run(self):
+        """Background write-behind loop, flushes every flush_interval seconds"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if self._journal_ops >= self.compact_every:
+                    await self.compact()
+                if time.monotonic() >= self._next_archive_check:
+                    self._next_archive_check = time.monotonic() + 3600
+                    await self.archive_history()
+            except Exception:
+                log.exception('persist_failed')
+
+    def close(self):
+        """Synchronously flush and compact, used at shutdown when the loop is gone"""
+        lines, self._pending = self._pending, []
+        if lines:
+            self._write_lines(lines)
+        if self._rotate_journal():
+            self._compact_files()
+
+# --- SQLite store ---
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shifts (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL
+);
+CREATE INDEX IF NOT EXISTS shifts_guild_user_ts ON shifts (guild_id, user_id, start_ts);
+CREATE INDEX IF NOT EXISTS shifts_open ON shifts (guild_id, user_id) WHERE end_ts IS NULL;
+
+CREATE TABLE IF NOT EXISTS checkins (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS checkins_guild_user_ts ON checkins (guild_id, user_id, ts);
+
+CREATE TABLE IF NOT EXISTS misses (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS misses_guild_user_ts ON misses (guild_id, user_id, ts);
+
+CREATE TABLE IF NOT EXISTS activity (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS activity_guild_user_ts ON activity (guild_id, user_id, ts);
+-- load_activity() reads the last hour of every user at startup
+CREATE INDEX IF NOT EXISTS activity_ts ON activity (ts);
+"""
+
+# Event kind -> (table, timestamp column)
+SQLITE_TABLES = {
+    'shifts': ('shifts', 'start_ts'),
+    'checkins': ('checkins', 'ts'),
+    'missed': ('misses', 'ts'),
+    'activity': ('activity', 'ts'),
+}
+
+def _where(guild_id, user_id=None, column=None, start=None, end=None):
+    """Build a WHERE clause that keeps to the (guild_id, user_id, ts) index prefix"""
+    clauses, params = [], []
+    if guild_id is not None:
+        clauses.append('guild_id = ?')
+        params.append(guild_id)
+    if user_id is not None:
+        clauses.append('user_id = ?')
+        params.append(int(user_id))
+    if start is not None:
+        clauses.append(f'{column} >= ?')
+        params.append(start)
+    if end is not None:
+        clauses.append(f'{column} < ?')
+        params.append(end)
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+class SQLiteStore(Store):
+    """SQLite backend. Every query runs on a single dedicated worker thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-store')
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SQLITE_SCHEMA)
+        return self._conn
+
+    def _execute(self, sql, params=(), fetch=None):
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(sql, params)
+            if fetch == 'one':
+                return cursor.fetchone()
+            if fetch == 'all':
+                return cursor.fetchall()
+            return None
+
+    def _executemany(self, sql, rows):
+        conn = self._connect()
+        with conn:
+            conn.executemany(sql, rows)
+
+    async def _call(self, func, *args):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            # Label by statement verb (insert/select/update) to keep cardinality low
+            op = args[0].split(None, 1)[0].lower() if args and isinstance(args[0], str) else func.__name__.strip('_')
+            self._observe(f'sqlite_{op}', started)
+
+    def load(self):
+        self._executor.submit(self._connect).result()
+
+    # --- Store API ---
+    async def start_shift(self, guild_id, user_id, ts):
+        self.version += 1
+        await self._call(self._execute, 'INSERT INTO shifts (guild_id, user_id, start_ts) VALUES (?, ?, ?)',
+                         (guild_id, int(user_id), ts))
+
+    async def end_shift(self, guild_id, user_id, ts):
+        self.version += 1
+        await self._call(self._execute,
+                         'UPDATE shifts SET end_ts = ? WHERE id = ('
+                         'SELECT id FROM shifts WHERE guild_id = ? AND user_id = ? AND end_ts IS NULL '
+                         'ORDER BY start_ts DESC LIMIT 1)',
+                         (ts, guild_id, int(user_id)))
+
+    async def add_checkin(self, guild_id, user_id, ts):
+        self.version += 1
+        await self._call(self._execute, 'INSERT INTO checkins VALUES (?, ?, ?)', (guild_id, int(user_id), ts))
+
+    async def add_missed(self, guild_id, user_id, ts):
+        self.version += 1
+        await self._call(self._execute, 'INSERT INTO misses VALUES (?, ?, ?)', (guild_id, int(user_id), ts))
+
+    async def add_activity(self, guild_id, user_id, channel_id, ts):
+        await self._call(self._execute, 'INSERT INTO activity VALUES (?, ?, ?, ?)',
+                         (guild_id, int(user_id), channel_id, ts))
+
+    def _trim_activity(self, before):
+        """Delete monitored messages older than before, returns how many went"""
+        conn = self._connect()
+        with conn:
+            return conn.execute('DELETE FROM activity WHERE ts < ?', (before,)).rowcount
+
+    async def run(self):
+        """Hourly trim of activity older than ACTIVITY_KEEP_DAYS; the JSON store caps it as messages come in"""
+        while True:
+            try:
+                trimmed = await self._call(self._trim_activity, time.time() - ACTIVITY_KEEP_DAYS * 86400)
+                if trimmed:
+                    log.info('activity_trimmed', rows=trimmed)
+            except Exception:
+                log.exception('persist_failed')
+            await asyncio.sleep(3600)
+
+    async def open_shift(self, guild_id, user_id):
+        where, params = _where(guild_id, user_id)
+        row = await self._call(self._execute,
+                               f'SELECT start_ts FROM shifts{where} AND end_ts IS NULL ORDER BY start_ts DESC LIMIT 1',
+                               params, 'one')
+        return row[0] if row else None
+
+    async def open_shifts(self):
+        return await self._call(self._execute,
+                                'SELECT guild_id, user_id, MAX(start_ts) FROM shifts '
+                                'WHERE end_ts IS NULL GROUP BY guild_id, user_id',
+                                (), 'all')
+
+    async def last_event(self, guild_id, user_id, kind):
+        table, column = SQLITE_TABLES[kind]
+        where, params = _where(guild_id, user_id)
+        row = await self._call(self._execute, f'SELECT MAX({column}) FROM {table}{where}', params, 'one')
+        return row[0] if row else None
+
+    async def count_events(self, guild_id, user_id, kind, start=None, end=None):
+        table, column = SQLITE_TABLES[kind]
+        where, params = _where(guild_id, user_id, column, start, end)
+        row = await self._call(self._execute, f'SELECT COUNT(*) FROM {table}{where}', params, 'one')
+        return row[0]
+
+    async def event_times(self, guild_id, user_id, kind, start=None, end=None):
+        table, column = SQLITE_TABLES[kind]
+        where, params = _where(guild_id, user_id, column, start, end)
+        rows = await self._call(self._execute, f'SELECT {column} FROM {table}{where} ORDER BY {column}', params, 'all')
+        return [row[0] for row in rows]
+
+    async def load_activity(self, since):
+        return await self._call(self._execute,
+                                'SELECT user_id, channel_id, ts FROM activity WHERE ts >= ? ORDER BY ts',
+                                (since,), 'all')
+
+    async def totals(self, guild_id, user_id):
+        where, params = _where(guild_id, user_id)
+        row = await self._call(self._execute,
+                               f'SELECT (SELECT COUNT(*) FROM shifts{where}), '
+                               f'(SELECT COUNT(*) FROM checkins{where}), '
+                               f'(SELECT COUNT(*) FROM misses{where})',
+                               params * 3, 'one')
+        return {'shifts': row[0], 'checkins': row[1], 'missed': row[2]}
+
+    async def event_counts(self, guild_id, kinds, start=None, end=None):
+        counts = {}
+        for kind in kinds:
+            table, column = SQLITE_TABLES[kind]
+            where, params = _where(guild_id, None, column, start, end)
+            rows = await self._call(self._execute,
+                                    f'SELECT user_id, COUNT(*) FROM {table}{where} GROUP BY user_id',
+                                    params, 'all')
+            for user_id, count in rows:
+                counts.setdefault(user_id, dict.fromkeys(kinds, 0))[kind] = count
+        return counts
+
+    async def load_events(self, kinds):
+        events = []
+        for kind in kinds:
+            table, column = SQLITE_TABLES[kind]
+            rows = await self._call(self._execute, f'SELECT guild_id, user_id, {column} FROM {table}', (), 'all')
+            events.extend((guild_id, user_id, kind, ts) for guild_id, user_id, ts in rows)
+        return events
+
+    async def events_between(self, guild_id, kinds, start, end):
+        events = []
+        for kind in kinds:
+            table, column = SQLITE_TABLES[kind]
+            where, params = _where(guild_id, None, column, start, end)
+            rows = await self._call(self._execute, f'SELECT user_id, {column} FROM {table}{where}', params, 'all')
+            events.extend((user_id, kind, ts) for user_id, ts in rows)
+        return events
+
+    async def shift_intervals(self, guild_id, start, end):
+        where, params = _where(guild_id)
+        return await self._call(self._execute,
+                                f'SELECT user_id, start_ts, end_ts FROM shifts{where} '
+                                f'AND start_ts < ? AND (end_ts IS NULL OR end_ts > ?)',
+                                (*params, end, start), 'all')
+
+    def close(self):
+        def _close():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        self._executor.submit(_close).result()
+        self._executor.shutdown()
+
+    # --- Import ---
+    def import_json(self, data, guild_id):
+        """Copy a mod_data.json dict into the database under one guild id"""
+        def _import():
+            shifts, checkins, misses, activity = [], [], [], []
+            for user_id, user_data in data.items():
+                user_id = int(user_id)
+                for shift in user_data.get('shifts', []):
+                    end = to_epoch(shift['end']) if shift.get('end') else None
+                    shifts.append((guild_id, user_id, to_epoch(shift['start']), end))
+                checkins.extend((guild_id, user_id, to_epoch(ts)) for ts in user_data.get('checkins', []))
+                misses.extend((guild_id, user_id, to_epoch(ts)) for ts in user_data.get('missed', []))
+                for msg in user_data.get('recent_messages', []):
+                    activity.append((guild_id, user_id, msg['channel_id'], to_epoch(msg['timestamp'])))
+            self._executemany('INSERT INTO shifts (guild_id, user_id, start_ts, end_ts) VALUES (?, ?, ?, ?)', shifts)
+            self._executemany('INSERT INTO checkins VALUES (?, ?, ?)', checkins)
+            self._executemany('INSERT INTO misses VALUES (?, ?, ?)', misses)
+            self._executemany('INSERT INTO activity VALUES (?, ?, ?, ?)', activity)
+            return len(shifts), len(checkins), len(misses), len(activity)
+        return self._executor.submit(_import).result()
+
+def open_store(backend, json_path, sqlite_path, tz, **journal_options):
+    """Create and load the configured store backend"""
+    if backend == 'sqlite':
+        store = SQLiteStore(sqlite_path)
+    elif backend == 'json':
+        store = JournalStore(json_path, tz, **journal_options)
+    else:
+        raise ValueError(f"Unknown STORE_BACKEND: {backend!r} (expected 'json' or 'sqlite')")
+    store.load()
+    return store
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Import mod_data.json into a SQLite store')
+    parser.add_argument('--json', default='mod_data.json', help='JSON snapshot to import (its journal is replayed too)')
+    parser.add_argument('--db', default='mod_data.db', help='SQLite database to write')
+    parser.add_argument('--guild-id', type=int, required=True, help='Guild the JSON data belongs to')
+    args = parser.parse_args()
+
+    journal = JournalStore(args.json, tz=None)
+    sqlite_store = SQLiteStore(args.db)
+    journal.load()
+    counts = sqlite_store.import_json(journal.full_history(), args.guild_id)
+    sqlite_store.close()
+    print("✅ Imported {} shifts, {} check-ins, {} misses, {} activity records into {}".format(*counts, args.db))
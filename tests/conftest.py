@@ -0,0 +1,29 @@
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'benchmarks'))
+
+@pytest.fixture(scope='session')
+def bot_module(tmp_path_factory):
+    """bot.py imported offline, with its data files and a SQLite lease table in a scratch directory"""
+    workdir = tmp_path_factory.mktemp('bot')
+    os.environ.setdefault('DISCORD_TOKEN', 'offline-tests')
+    os.environ['STORE_BACKEND'] = 'sqlite'
+    os.environ['LEASE_BACKEND'] = 'sqlite'
+    os.environ['LEASE_PATH'] = str(workdir / 'leases.db')
+    os.environ['SQLITE_PATH'] = str(workdir / 'mod_data.db')
+    os.environ['GUILD_CONFIG_PATH'] = str(workdir / 'guild_config.json')
+    previous = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import bot
+    finally:
+        os.chdir(previous)
+    return bot
@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+from guild_config import GuildConfigs, GuildSettings
+
+DEFAULTS = GuildSettings(role_name='Moderator', log_channel_name='shift-logs', monitored_channels=(),
+                         checkin_interval=1500, grace_period=300, miss_limit=3)
+
+def test_file_edits_reach_listeners_and_the_follow_up(tmp_path):
+    path = tmp_path / 'guild_config.json'
+    configs = GuildConfigs(str(path), DEFAULTS).load()
+    invalidated, applied = [], []
+    configs.listeners.append(invalidated.append)
+
+    async def apply(guild_id, before):
+        # Runs after the new settings are in place, like after *config set
+        applied.append((guild_id, before.role_name, configs.get(guild_id).role_name))
+
+    async def scenario():
+        watcher = asyncio.create_task(configs.watch(interval=0.01, on_change=apply))
+        path.write_text(json.dumps({'1': {'role_name': 'Staff'}, '2': {'miss_limit': 5}}))
+        for _ in range(200):
+            if len(applied) == 2:
+                break
+            await asyncio.sleep(0.01)
+        watcher.cancel()
+
+    asyncio.run(scenario())
+    assert sorted(invalidated) == [1, 2]
+    assert applied == [(1, 'Moderator', 'Staff'), (2, 'Moderator', 'Moderator')]
+
+def test_a_failing_follow_up_does_not_stop_the_others(tmp_path):
+    path = tmp_path / 'guild_config.json'
+    configs = GuildConfigs(str(path), DEFAULTS).load()
+    applied = []
+
+    async def apply(guild_id, before):
+        if guild_id == 1:
+            raise RuntimeError('missing permissions')
+        applied.append(guild_id)
+
+    async def scenario():
+        watcher = asyncio.create_task(configs.watch(interval=0.01, on_change=apply))
+        path.write_text(json.dumps({'1': {'miss_limit': 1}, '2': {'miss_limit': 2}}))
+        for _ in range(200):
+            if applied:
+                break
+            await asyncio.sleep(0.01)
+        watcher.cancel()
+
+    asyncio.run(scenario())
+    assert applied == [2]
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import time
+
+from fakes import FakeGuild
+from leases import SQLiteLeases
+
+PARTITIONS = 8
+TTL = 30
+
+def replicas(tmp_path, *names):
+    path = str(tmp_path / 'leases.db')
+    return [SQLiteLeases(path) for _ in names]
+
+def test_single_replica_takes_every_partition(tmp_path):
+    a, = replicas(tmp_path, 'a')
+    held = a.renew('a', PARTITIONS, TTL, 1000.0)
+    assert sorted(held) == list(range(PARTITIONS))
+    assert set(held.values()) == {1}
+
+def test_renewing_keeps_tokens(tmp_path):
+    a, = replicas(tmp_path, 'a')
+    first = a.renew('a', PARTITIONS, TTL, 1000.0)
+    assert a.renew('a', PARTITIONS, TTL, 1010.0) == first
+
+def test_new_replica_gets_a_fair_share(tmp_path):
+    a, b = replicas(tmp_path, 'a', 'b')
+    a.renew('a', PARTITIONS, TTL, 1000.0)
+    # Everything is still leased to a, so b waits for a to hand partitions back
+    assert b.renew('b', PARTITIONS, TTL, 1001.0) == {}
+    held_a = a.renew('a', PARTITIONS, TTL, 1002.0)
+    held_b = b.renew('b', PARTITIONS, TTL, 1003.0)
+    assert len(held_a) == len(held_b) == PARTITIONS // 2
+    assert not set(held_a) & set(held_b)
+    # Every grant of a partition bumps its token
+    assert set(held_b.values()) == {2}
+
+def test_expired_replica_is_taken_over(tmp_path):
+    a, b = replicas(tmp_path, 'a', 'b')
+    a.renew('a', PARTITIONS, TTL, 1000.0)
+    held = b.renew('b', PARTITIONS, TTL, 1000.0 + TTL + 1)
+    assert sorted(held) == list(range(PARTITIONS))
+    assert set(held.values()) == {2}
+
+def test_claim_is_fenced_by_token(tmp_path):
+    a, b = replicas(tmp_path, 'a', 'b')
+    token_a = a.renew('a', PARTITIONS, TTL, 1000.0)[0]
+    assert a.claim(0, token_a, 'remind:1', 1001.0)
+    # The same deadline is only acted on once
+    assert not a.claim(0, token_a, 'remind:1', 1002.0)
+    # Past its lease a replica cannot claim, even before anyone else took over
+    assert not a.claim(0, token_a, 'remind:2', 1000.0 + TTL + 1)
+    token_b = b.renew('b', PARTITIONS, TTL, 1000.0 + TTL + 1)[0]
+    assert not a.claim(0, token_a, 'remind:2', 1000.0 + TTL + 2)
+    assert b.claim(0, token_b, 'remind:2', 1000.0 + TTL + 2)
+
+def test_release_frees_partitions_right_away(tmp_path):
+    a, b = replicas(tmp_path, 'a', 'b')
+    a.renew('a', PARTITIONS, TTL, 1000.0)
+    a.release('a')
+    assert len(b.renew('b', PARTITIONS, TTL, 1001.0)) == PARTITIONS
+
+# --- Handover ---
+def pending(scheduler, guild_id, user_id):
+    """(kind, when) of the pending deadline of the user's shift in guild_id, or None"""
+    seq = scheduler._pending.get((guild_id, user_id))
+    return next(((kind, when) for when, entry_seq, _, _, kind, _ in scheduler._heap if entry_seq == seq), None)
+
+def test_handover_after_claimed_deadlines_keeps_the_chain(bot_module):
+    bot = bot_module
+    guild = FakeGuild('Handover')
+    role = guild.add_role(bot.MOD_ROLE_NAME)
+    guild.add_channel(bot.SHIFT_LOG_CHANNEL_NAME)
+    mod = guild.add_member('mod', [role])
+    bot.bot.get_guild = {guild.id: guild}.get
+    bot.resolver.refresh(guild)
+    settings = bot.guild_configs.get(guild.id)
+
+    async def scenario():
+        now = time.time()
+        base = now - settings.checkin_interval - settings.grace_period - 60
+        await bot.store.start_shift(guild.id, mod.id, base)
+
+        # The previous holder handled this window's reminder and miss, then shut down
+        old = SQLiteLeases(os.environ['LEASE_PATH'])
+        partition = bot.leases.partition(mod.id)
+        token = old.renew('old', bot.leases.partitions, bot.leases.ttl, now)[partition]
+        assert old.claim(partition, token, f'{mod.id}:remind:{base}', now)
+        assert old.claim(partition, token, f'{mod.id}:miss:{base}', now)
+        old.release('old')
+        old.close()
+        await bot.leases.renew()
+        assert bot.leases.owns(mod.id)
+
+        await bot.handle_deadline(mod.id, guild.id, 'remind', base)
+        assert pending(bot.reminders, guild.id, mod.id) == (
+            'miss', base + settings.checkin_interval + settings.grace_period)
+
+        await bot.handle_deadline(mod.id, guild.id, 'miss', base)
+        kind, when = pending(bot.reminders, guild.id, mod.id)
+        assert kind == 'remind'
+        assert when >= now + bot.leases.ttl
+        # Neither deadline was acted on twice
+        assert await bot.store.count_events(guild.id, mod.id, 'missed') == 0
+        assert bot.notifier.queue.qsize() == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from fakes import FakeGuild
+
+def pending(scheduler, guild_id, user_id):
+    """(kind, when) of the pending deadline of the user's shift in guild_id, or None"""
+    seq = scheduler._pending.get((guild_id, user_id))
+    return next(((kind, when) for when, entry_seq, _, _, kind, _ in scheduler._heap if entry_seq == seq), None)
+
+def mod_in_grace_period(bot):
+    """A mod on shift whose reminder went out, with the miss pending"""
+    guild = FakeGuild('Config')
+    role = guild.add_role(bot.MOD_ROLE_NAME)
+    guild.add_channel(bot.SHIFT_LOG_CHANNEL_NAME)
+    mod = guild.add_member('mod', [role])
+    bot.bot.get_guild = {guild.id: guild}.get
+    bot.resolver.refresh(guild)
+    settings = bot.guild_configs.get(guild.id)
+    base = time.time() - settings.checkin_interval - 60
+    asyncio.run(bot.store.start_shift(guild.id, mod.id, base))
+    miss_at = base + settings.checkin_interval + settings.grace_period
+    bot.reminders.schedule(mod.id, guild.id, 'miss', miss_at, base)
+    return guild, mod, base, settings
+
+def test_unrelated_config_change_leaves_deadlines_alone(bot_module):
+    bot = bot_module
+    guild, mod, base, settings = mod_in_grace_period(bot)
+    before = pending(bot.reminders, guild.id, mod.id)
+    asyncio.run(bot.apply_guild_config(guild, settings.replace(miss_limit=settings.miss_limit + 1)))
+    assert pending(bot.reminders, guild.id, mod.id) == before
+
+def test_new_interval_does_not_repeat_a_sent_reminder(bot_module):
+    bot = bot_module
+    guild, mod, base, settings = mod_in_grace_period(bot)
+    # The window is still past its reminder under the shorter grace period, only the miss moves
+    before = settings.replace(grace_period=settings.grace_period + 600)
+    asyncio.run(bot.apply_guild_config(guild, before))
+    assert pending(bot.reminders, guild.id, mod.id) == ('miss', base + settings.checkin_interval + settings.grace_period)
+
+def test_longer_interval_moves_the_reminder(bot_module):
+    bot = bot_module
+    guild, mod, base, settings = mod_in_grace_period(bot)
+    asyncio.run(bot.guild_configs.update(guild.id, checkin_interval=settings.checkin_interval + 3600))
+    try:
+        asyncio.run(bot.apply_guild_config(guild, settings))
+        assert pending(bot.reminders, guild.id, mod.id) == ('remind', base + settings.checkin_interval + 3600)
+    finally:
+        asyncio.run(bot.guild_configs.update(guild.id, checkin_interval=None))
@@ -0,0 +1,75 @@
+import asyncio
+
+from fakes import FakeGuild, FakeMember
+from resolver import GuildResolver
+
+NAMES = ('Moderator', 'shift-logs')
+
+def lean_guild():
+    guild = FakeGuild('Lean')
+    role = guild.add_role(NAMES[0])
+    guild.add_channel(NAMES[1])
+    resolver = GuildResolver(lambda guild_id: NAMES, lean=True)
+    return guild, role, resolver
+
+def test_lean_mods_are_learned_from_their_messages():
+    guild, role, resolver = lean_guild()
+    # Not in the member cache, as with a mod whose role predates startup
+    mod = FakeMember(guild, 'mod', [role])
+    assert resolver.mod_ids(guild) == set()
+    assert resolver.is_mod(mod)
+    assert resolver.mod_ids(guild) == {mod.id}
+    assert resolver.member(guild, mod.id) is mod
+
+def test_learned_mods_survive_a_config_change():
+    guild, role, resolver = lean_guild()
+    mod = FakeMember(guild, 'mod', [role])
+    resolver.is_mod(mod)
+    resolver.invalidate(guild.id)
+    assert resolver.mod_ids(guild) == {mod.id}
+    assert [member.id for member in resolver.mods(guild)] == [mod.id]
+
+def test_learned_mod_without_the_role_is_dropped():
+    guild, role, resolver = lean_guild()
+    mod = FakeMember(guild, 'mod', [role])
+    resolver.is_mod(mod)
+    mod.roles = []
+    assert not resolver.is_mod(mod)
+    assert resolver.mod_ids(guild) == set()
+    assert resolver.member(guild, mod.id) is None
+
+def test_forget_drops_learned_mods():
+    guild, role, resolver = lean_guild()
+    mod = FakeMember(guild, 'mod', [role])
+    resolver.is_mod(mod)
+    resolver.forget(guild.id)
+    assert resolver.mod_ids(guild) == set()
+
+class QueriedGuild(FakeGuild):
+    """A guild whose members are only known to Discord, as in lean mode"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.remote = {}
+        self.cached_by_query = []
+
+    async def query_members(self, query=None, *, limit=5, user_ids=None, cache=True):
+        members = [self.remote[user_id] for user_id in user_ids if user_id in self.remote]
+        if cache:
+            self.cached_by_query.extend(members)
+        return members
+
+def test_load_mods_keeps_only_role_holders_and_caches_no_one():
+    guild = QueriedGuild('Lean')
+    role = guild.add_role(NAMES[0])
+    guild.add_channel(NAMES[1])
+    resolver = GuildResolver(lambda guild_id: NAMES, lean=True)
+    mod = FakeMember(guild, 'mod', [role])
+    former = FakeMember(guild, 'former')
+    guild.remote = {mod.id: mod, former.id: former}
+
+    assert asyncio.run(resolver.load_mods(guild, [mod.id, former.id])) == 1
+    assert guild.cached_by_query == []
+    assert resolver.mod_ids(guild) == {mod.id}
+    assert resolver.member(guild, mod.id) is mod
+    assert resolver.member(guild, former.id) is None
@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+import pytz
+
+from rollups import DailyRollups
+
+PKT = pytz.timezone('Asia/Karachi')
+
+class FakeStore:
+    def __init__(self, events):
+        self.events = events
+
+    async def load_events(self, kinds):
+        return [event for event in self.events if event[2] in kinds]
+
+def test_counts_are_kept_per_guild():
+    rollups = DailyRollups(PKT)
+    now = time.time()
+    rollups.add(1, 10, 'missed', now)
+    rollups.add(1, 10, 'missed', now)
+    rollups.add(2, 10, 'missed', now)
+    assert rollups.count_today(1, 10, 'missed') == 2
+    assert rollups.count_today(2, 10, 'missed') == 1
+    # No guild, e.g. *my_stats in a DM, counts every guild
+    assert rollups.count_today(None, 10, 'missed') == 3
+    today = rollups.today()
+    assert rollups.summary(2, ('checkins', 'missed'), today - 6, today) == {10: {'checkins': 0, 'missed': 1}}
+    assert rollups.summary(None, ('missed',), today - 6, today) == {10: {'missed': 3}}
+
+def test_store_without_guilds_shares_one_counter():
+    rollups = DailyRollups(PKT, per_guild=False)
+    now = time.time()
+    rollups.add(1, 10, 'checkins', now)
+    rollups.add(2, 10, 'checkins', now)
+    assert rollups.count_today(1, 10, 'checkins') == 2
+    today = rollups.today()
+    assert rollups.summary(1, ('checkins',), today, today) == {10: {'checkins': 2}}
+
+def test_rebuild_keeps_guilds_apart():
+    now = time.time()
+    store = FakeStore([(1, 10, 'missed', now), (2, 10, 'missed', now), (2, 10, 'checkins', now)])
+    rollups = DailyRollups(PKT)
+    assert asyncio.run(rollups.rebuild(store)) == 3
+    assert rollups.count_today(1, 10, 'missed') == 1
+    assert rollups.count_today(2, 10, 'checkins') == 1
+    assert rollups.count_today(1, 10, 'checkins') == 0
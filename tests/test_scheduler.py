@@ -0,0 +1,19 @@
+from scheduler import DeadlineScheduler
+
+async def ignore(user_id, guild_id, kind, base):
+    pass
+
+def test_shifts_in_two_guilds_keep_their_own_deadlines():
+    scheduler = DeadlineScheduler(ignore)
+    scheduler.schedule(10, 1, 'remind', 100.0, 0.0)
+    scheduler.schedule(10, 2, 'miss', 200.0, 50.0)
+    assert len(scheduler) == 2
+    # Ending the shift in guild 1 leaves the one in guild 2 running
+    scheduler.cancel(10, 1)
+    assert scheduler._pop_due(1000.0) == [(10, 2, 'miss', 50.0)]
+
+def test_store_without_guilds_has_one_deadline_per_user():
+    scheduler = DeadlineScheduler(ignore, per_guild=False)
+    scheduler.schedule(10, None, 'remind', 100.0, 0.0)
+    scheduler.schedule(10, 1, 'remind', 150.0, 50.0)
+    assert scheduler._pop_due(1000.0) == [(10, 1, 'remind', 50.0)]
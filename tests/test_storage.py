@@ -0,0 +1,201 @@
+import asyncio
+import json
+import shutil
+import time
+
+import pytest
+import pytz
+
+from snapshot import SnapshotReader
+from storage import ACTIVITY_KEEP_DAYS, JournalStore, SQLiteStore, replay_journal
+
+PKT = pytz.timezone('Asia/Karachi')
+
+def write_journal(path, ops, tail=''):
+    with open(path, 'w') as f:
+        f.writelines(json.dumps(op) + '\n' for op in ops)
+        f.write(tail)
+
+def append_op(seq, value, user='1', field='checkins'):
+    op = {'op': 'append', 'user': user, 'field': field, 'value': value}
+    if seq is not None:
+        op['seq'] = seq
+    return op
+
+# --- replay_journal ---
+def test_replay_applies_ops_in_order(tmp_path):
+    path = str(tmp_path / 'journal')
+    write_journal(path, [
+        append_op(1, {'start': 'a', 'end': None}, field='shifts'),
+        {'op': 'end_shift', 'user': '1', 'end': 'b', 'seq': 2},
+        append_op(3, 'c'),
+    ])
+    data = {}
+    assert replay_journal(data, path) == (3, 3)
+    assert data['1']['shifts'] == [{'start': 'a', 'end': 'b'}]
+    assert data['1']['checkins'] == ['c']
+
+def test_replay_skips_ops_already_in_the_snapshot(tmp_path):
+    path = str(tmp_path / 'journal')
+    write_journal(path, [append_op(4, 'a'), append_op(5, 'b'), append_op(6, 'c')])
+    data = {}
+    assert replay_journal(data, path, after=5) == (1, 6)
+    assert data['1']['checkins'] == ['c']
+
+def test_replay_always_applies_ops_without_a_sequence_number(tmp_path):
+    path = str(tmp_path / 'journal')
+    write_journal(path, [append_op(None, 'a')])
+    data = {}
+    assert replay_journal(data, path, after=10) == (1, 10)
+    assert data['1']['checkins'] == ['a']
+
+def test_replay_stops_at_a_torn_tail(tmp_path):
+    path = str(tmp_path / 'journal')
+    write_journal(path, [append_op(1, 'a')], tail='{"op": "app')
+    data = {}
+    assert replay_journal(data, path) == (1, 1)
+
+def test_replay_of_a_missing_journal(tmp_path):
+    assert replay_journal({}, str(tmp_path / 'missing'), after=7) == (0, 7)
+
+# --- Compaction and recovery ---
+def open_store(tmp_path, snapshot_format):
+    store = JournalStore(str(tmp_path / 'mod_data.json'), PKT, snapshot_format=snapshot_format)
+    store.load()
+    return store
+
+async def record_shift(store, user_id, start):
+    await store.start_shift(None, user_id, start)
+    await store.add_checkin(None, user_id, start + 60)
+    await store.end_shift(None, user_id, start + 120)
+
+@pytest.mark.parametrize('snapshot_format', ['json', 'binary'])
+def test_compaction_keeps_every_record(tmp_path, snapshot_format):
+    start = int(time.time()) - 3600
+    store = open_store(tmp_path, snapshot_format)
+
+    async def scenario():
+        await record_shift(store, 1, start)
+        await store.compact()
+        await store.add_checkin(None, 1, start + 180)
+        await store.flush()
+
+    asyncio.run(scenario())
+    store.close()
+    reopened = open_store(tmp_path, snapshot_format)
+    totals = asyncio.run(reopened.totals(None, 1))
+    assert totals == {'shifts': 1, 'checkins': 2, 'missed': 0}
+    assert asyncio.run(reopened.open_shift(None, 1)) is None
+
+@pytest.mark.parametrize('snapshot_format', ['json', 'binary'])
+def test_crash_between_snapshot_and_journal_removal(tmp_path, snapshot_format):
+    start = int(time.time()) - 3600
+    store = open_store(tmp_path, snapshot_format)
+    asyncio.run(record_shift(store, 1, start))
+    asyncio.run(store.flush())
+    # Compact, then put the folded journal back as if the process died before removing it
+    assert store._rotate_journal()
+    shutil.copy(store.compacting_path, str(tmp_path / 'kept'))
+    store._compact_files()
+    shutil.copy(str(tmp_path / 'kept'), store.compacting_path)
+
+    reopened = open_store(tmp_path, snapshot_format)
+    assert asyncio.run(reopened.totals(None, 1)) == {'shifts': 1, 'checkins': 1, 'missed': 0}
+    # New ops continue the sequence, and folding the leftover journal again changes nothing
+    asyncio.run(reopened.add_checkin(None, 1, start + 180))
+    reopened.close()
+    again = open_store(tmp_path, snapshot_format)
+    assert asyncio.run(again.totals(None, 1)) == {'shifts': 1, 'checkins': 2, 'missed': 0}
+
+def test_snapshot_records_the_last_folded_op(tmp_path):
+    store = open_store(tmp_path, 'binary')
+    asyncio.run(record_shift(store, 1, int(time.time()) - 3600))
+    store.close()
+    assert SnapshotReader(store.binary_path).journal_seq == 3
+
+# --- Range scans ---
+@pytest.mark.parametrize('snapshot_format', ['json', 'binary'])
+def test_range_scans_cover_snapshot_and_journal(tmp_path, snapshot_format):
+    start = int(time.time()) - 3600
+    store = open_store(tmp_path, snapshot_format)
+    asyncio.run(record_shift(store, 1, start))
+    store.close()
+    # User 1 is still only in the snapshot when reopened, user 2 only in memory
+    reopened = open_store(tmp_path, snapshot_format)
+    asyncio.run(reopened.start_shift(None, 2, start + 600))
+
+    events = asyncio.run(reopened.events_between(None, ('shifts', 'checkins'), start, start + 3600))
+    assert sorted(events) == [(1, 'checkins', start + 60), (1, 'shifts', start), (2, 'shifts', start + 600)]
+    intervals = asyncio.run(reopened.shift_intervals(None, start + 90, start + 3600))
+    assert sorted(intervals) == [(1, start, start + 120), (2, start + 600, None)]
+    reopened.close()
+
+@pytest.mark.parametrize('snapshot_format', ['json', 'binary'])
+def test_whole_store_scans(tmp_path, snapshot_format):
+    start = int(time.time()) - 3600
+    store = open_store(tmp_path, snapshot_format)
+    asyncio.run(record_shift(store, 1, start))
+    store.close()
+    reopened = open_store(tmp_path, snapshot_format)
+    asyncio.run(reopened.add_checkin(None, 2, start + 600))
+
+    counts = asyncio.run(reopened.event_counts(None, ('shifts', 'checkins')))
+    assert counts == {1: {'shifts': 1, 'checkins': 1}, 2: {'shifts': 0, 'checkins': 1}}
+    events = asyncio.run(reopened.load_events(('checkins',)))
+    assert sorted(events) == [(None, 1, 'checkins', start + 60), (None, 2, 'checkins', start + 600)]
+    status = asyncio.run(reopened.retention_status())
+    assert (status['hot_users'], status['hot_records']) == (2, 3)
+    reopened.close()
+
+# --- Journal writes ---
+def journal_lines(store):
+    with open(store.journal_path) as f:
+        return sum(1 for _ in f)
+
+def test_ops_recorded_during_a_flush_reach_the_journal(tmp_path):
+    store = open_store(tmp_path, 'json')
+    start = int(time.time()) - 3600
+
+    async def scenario():
+        async def keep_flushing():
+            for _ in range(50):
+                await store.flush()
+
+        async def keep_writing():
+            for i in range(500):
+                await store.add_checkin(None, 1, start + i)
+                if i % 10 == 0:
+                    await asyncio.sleep(0)
+
+        await asyncio.gather(keep_flushing(), keep_writing())
+        await store.flush()
+
+    asyncio.run(scenario())
+    assert journal_lines(store) == 500
+
+def test_sync_durability_writes_before_returning(tmp_path):
+    store = JournalStore(str(tmp_path / 'mod_data.json'), PKT, durability='sync')
+    store.load()
+    asyncio.run(store.add_checkin(None, 1, int(time.time())))
+    assert journal_lines(store) == 1
+
+# --- SQLite activity ---
+def test_sqlite_activity_is_trimmed_by_age(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'mod_data.db'))
+    store.load()
+    now = time.time()
+    cutoff = now - ACTIVITY_KEEP_DAYS * 86400
+
+    async def scenario():
+        for ts in (cutoff - 60, cutoff + 60, now):
+            await store.add_activity(1, 10, 7, ts)
+        return await store._call(store._trim_activity, cutoff)
+
+    assert asyncio.run(scenario()) == 1
+    assert [ts for _, _, ts in asyncio.run(store.load_activity(0))] == [cutoff + 60, now]
+    # The startup read of the last hour goes through the ts index
+    plan = asyncio.run(store._call(
+        store._execute, 'EXPLAIN QUERY PLAN SELECT user_id, channel_id, ts FROM activity WHERE ts >= ? ORDER BY ts',
+        (now,), 'all'))
+    assert any('activity_ts' in row[-1] for row in plan)
+    store.close()